@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from simulation import simulation
+
+# names of the planets used in the summary
+PLANETS = {1: "earth", 2: "moon", 3: "mars", 4: "ice"}
+
+def run_match(planet, seed, max_steps, aiming=False, procedural=False, settling=False, tanks=2):
+    """
+    Simulates a match between AI enemies without display.
+
+    Parameters:
+    - planet (int): An integer representing the chosen planet (1 for Earth, 2 for Moon, 3 for Mars, 4 for Ice Planet).
+    - seed (int): Seed of the random decisions of the AI enemies.
+    - max_steps (int): Maximal number of frames, the match ends without winner afterwards.
+    - aiming (bool, optional): If True the AI enemies use the aim solver instead of shooting at random.
+    - procedural (bool, optional): If True every match is played on its own ground generated from noise.
+    - settling (bool, optional): If True loose ground above craters falls down.
+    - tanks (int, optional): Number of tanks, every tank is its own team.
+
+    Returns:
+    - dict: Result of the match (planet, seed, winner, number of frames, points, shots and hits of every tank).
+    """
+    sim = simulation(planet, computer_tanks=tuple(range(tanks)), num_tanks=tanks, seed=seed, aiming=aiming, 
+                     procedural=procedural, settling=settling)
+    steps = 0
+    while sim.winner is None and steps < max_steps:
+        sim.step()
+        steps += 1
+
+    return({
+        "planet": planet,
+        "seed": seed,
+        "winner": None if sim.winner is None else sim.winner.counter,
+        "steps": steps,
+        "points": [panzer.points for panzer in sim.tanks],
+        "shots": [panzer.shots for panzer in sim.tanks],
+        "hits": [panzer.hits for panzer in sim.tanks],
+    })
+
+def aggregate(results):
+    """
+    Aggregates the results of matches per planet.
+
+    Parameters:
+    - results (list): Results of matches as returned by run_match.
+
+    Returns:
+    - dict: Statistics per planet (matches, wins of every tank, draws, mean match length, shots fired and hit ratio).
+    """
+    stats = {}
+    for result in results:
+        planet = stats.setdefault(result["planet"], {"matches": 0, "wins": [0] * len(result["points"]), "draws": 0, "steps": 0, 
+                                                     "shots": 0, "hits": 0})
+        planet["matches"] += 1
+        if result["winner"] is None:
+            planet["draws"] += 1
+        else:
+            planet["wins"][result["winner"]] += 1
+        planet["steps"] += result["steps"]
+        planet["shots"] += sum(result["shots"])
+        planet["hits"] += sum(result["hits"])
+
+    for planet in stats.values():
+        planet["win_rates"] = [wins / planet["matches"] for wins in planet["wins"]]
+        planet["mean_steps"] = planet["steps"] / planet["matches"]
+        planet["hit_ratio"] = planet["hits"] / planet["shots"] if planet["shots"] else 0
+    return(stats)
+
+def print_summary(stats):
+    # one column for the win rate of every tank
+    tanks = max(len(s["wins"]) for s in stats.values())
+    wins = "".join(f"{'win ' + str(k):>8}" for k in range(tanks))
+    print(f"{'planet':<8}{'matches':>9}{wins}{'draws':>8}{'frames':>10}{'shots':>10}{'hit ratio':>11}")
+    for planet in sorted(stats):
+        s = stats[planet]
+        wins = "".join(f"{rate:>8.1%}" for rate in s["win_rates"])
+        print(f"{PLANETS[planet]:<8}{s['matches']:>9}{wins}{s['draws']:>8}"
+              f"{s['mean_steps']:>10.0f}{s['shots']:>10}{s['hit_ratio']:>11.1%}")
+
+def main(argv=None):
+    """
+    Runs matches between AI enemies on all cores and prints statistics per planet.
+
+    Parameters:
+    - argv (list, optional): Command line arguments (sys.argv is used if None).
+    """
+    parser = argparse.ArgumentParser(description="Run AI vs AI matches of the artillery game without display.")
+    parser.add_argument("--matches", type=int, default=100, help="number of matches per planet")
+    parser.add_argument("--planets", type=int, nargs="+", default=[1, 2, 3, 4], choices=[1, 2, 3, 4], help="planets to play on")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match, the following matches use the next seeds")
+    parser.add_argument("--max-steps", type=int, default=25 * 60 * 10, help="maximal number of frames per match")
+    parser.add_argument("--aiming", action="store_true", help="AI enemies aim with the aim solver")
+    parser.add_argument("--procedural", action="store_true", help="generate the ground of every match from noise")
+    parser.add_argument("--settling", action="store_true", help="loose ground above craters falls down")
+    parser.add_argument("--tanks", type=int, default=2, help="number of tanks per match, every tank is its own team")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    results = []
+    total = args.matches * len(args.planets)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(run_match, planet, args.seed + k, args.max_steps, args.aiming, args.procedural, 
+                               args.settling, args.tanks)
+                   for planet in args.planets for k in range(args.matches)]
+        # results are collected as soon as a match is over
+        for future in as_completed(futures):
+            results.append(future.result())
+            print(f"\r{len(results)} / {total} matches", end="", file=sys.stderr)
+    duration = time.time() - start
+    simulated = sum(result["steps"] for result in results) / 25
+    print(f"\r{total} matches in {duration:.1f} s ({simulated / duration:.0f} simulated seconds per second)", file=sys.stderr)
+
+    print_summary(aggregate(results))
+
+if __name__ == "__main__":
+    main()
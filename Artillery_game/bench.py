@@ -0,0 +1,280 @@
+import os
+# the benchmarks do not need a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import numpy as np
+import pygame
+import main as game
+from simulation import (simulation, func_to_ground, update_ground, gradient, planet_settings,
+                        MOVE_LEFT, MOVE_RIGHT, MOVE_STOP, ANGLE_UP, ANGLE_DOWN, SHOOT)
+from tank import missile_pool, aim_solver, ANGLES
+from particles import particle_pool, DIRT, SMOKE
+from heightmap import load_heightmap, heightmap_to_ground
+from batch import PLANETS
+
+# actions of the player in the benchmark of a whole frame, repeated every len(SCRIPT) frames
+SCRIPT = [MOVE_RIGHT, 0, ANGLE_UP, ANGLE_UP, SHOOT, 0, 0, MOVE_STOP, ANGLE_DOWN, SHOOT, MOVE_LEFT, 0, SHOOT, MOVE_STOP, 0, 0]
+
+def bench_func_to_ground(planet):
+    # the chunks are generated lazily, so all columns are requested
+    ground_func = planet_settings(planet)[2]
+    return(lambda: func_to_ground(ground_func, game.window_width, game.window_height).columns(0, game.window_width))
+
+def bench_heightmap(planet, cached):
+    # cached: the heightmap is mapped from the cache on disk, otherwise the chunks of the window are generated
+    if cached:
+        load_heightmap(planet, 0, game.window_width * 10, game.window_height)
+    return(lambda: heightmap_to_ground(planet, 0, game.window_width * 10, game.window_height, cached).columns(0, game.window_width))
+
+def bench_update_ground(radius):
+    # missiles 10 pixels beneath the surface of 8 columns, the ground is restored before every call
+    sim = simulation(1, game.window_width, game.window_height, seed=0)
+    ground = sim.ground
+    columns = np.linspace(50, ground.width - 50, 8).astype(int)
+    positions = np.column_stack([columns, ground.surfaces(columns) + 10])
+    saved = {k: (chunk.bits.copy(), chunk.top.copy(), chunk.solid.copy()) for k, chunk in ground.chunks.items()}
+    def run():
+        for k, (bits, top, solid) in saved.items():
+            chunk = ground.chunks[k]
+            chunk.bits[:], chunk.top[:], chunk.solid[:] = bits, top, solid
+        ground.caves.clear()
+        ground.dirty.clear()
+        update_ground(positions, ground, radius)
+    return(run)
+
+def bench_settle():
+    # tunnels 40 pixels beneath the surface of 8 columns, the ground is carved again once it has settled
+    sim = simulation(1, game.window_width, game.window_height, seed=0, settling=True)
+    ground = sim.ground
+    columns = np.linspace(50, ground.width - 50, 8).astype(int)
+    def run():
+        if not ground.unsettled:
+            for m in columns.tolist():
+                ground.carve(ground.surface(m) + 40, m, 24)
+        ground.settle()
+        ground.dirty.clear()
+    return(run)
+
+def bench_draw_ground(full):
+    # full: the whole ground is drawn again (as after loading a match), otherwise only the layer is blitted
+    sim = simulation(1, game.window_width, game.window_height, seed=0)
+    layer = game.ground_layer(sim.ground, (76, 153, 0))
+    def run():
+        if full:
+            sim.ground.dirty.append((0, sim.ground.width))
+        game.draw_ground(layer)
+    return(run)
+
+def bench_particles(count):
+    # count particles thrown from the middle of the window, they are thrown again every 25 frames
+    particles = particle_pool({kind: ((255, 255, 255), (0, 0, 0)) for kind in range(3)}, capacity=count)
+    state = {"frame": 0}
+    def run():
+        if state["frame"] % 25 == 0:
+            particles.emit(DIRT, game.window_width / 2, game.window_height / 2, count // 2)
+            particles.emit(SMOKE, game.window_width / 2, game.window_height / 2, count - count // 2)
+        particles.update()
+        particles.draw(game.screen)
+        state["frame"] += 1
+    return(run)
+
+def bench_position_update(count):
+    # missiles fired at all angles from the left border, they restart once they have landed
+    sim = simulation(1, game.window_width, game.window_height, seed=0)
+    missiles = missile_pool(sim.g, sim.height)
+    def launch():
+        missiles.clear()
+        for k in range(count):
+            missiles.launch(ANGLES[k % len(ANGLES)], np.array([50, 300]), 0, sim.vel_norm, 1)
+    launch()
+    def run():
+        if missiles.age[0] >= missiles.table.shape[1] - 1:
+            launch()
+        missiles.position_update(sim.ground)
+    return(run)
+
+def bench_falling():
+    # a tank falling from the sky, it starts again once it has landed
+    sim = simulation(1, game.window_width, game.window_height, seed=0)
+    panzer = sim.tanks[0]
+    def run():
+        if sim.ground.is_ground(panzer.position[1] + 1, panzer.position[0]):
+            panzer.position[1] = 0
+        panzer.falling(sim.ground)
+    return(run)
+
+def bench_gradient():
+    sim = simulation(1, game.window_width, game.window_height, seed=0)
+    positions = [np.array([x, sim.ground.surface(x)]) for x in range(0, sim.width, 31)]
+    def run():
+        for position in positions:
+            gradient(position, 1, sim.ground)
+    return(run)
+
+def bench_aim_solver():
+    sim = simulation(1, game.window_width, game.window_height, seed=0)
+    shooter, target = sim.tanks[0], sim.tanks[1]
+    launch_position = np.array([shooter.spawn[0], sim.ground.surface(shooter.spawn[0]) - 10])
+    target_position = np.array([target.spawn[0], sim.ground.surface(target.spawn[0]) - 8])
+    return(lambda: aim_solver(launch_position, shooter.facing, sim.g, sim.vel_norm, sim.ground, target_position))
+
+def bench_step(planet):
+    # a tick of a headless match between two computer tanks as run by batch.py (the match starts again when it is
+    # over or after 2000 ticks, so every measurement covers the same ticks)
+    # 60 to 140 us per tick on one core depending on the planet and the load, i.e. 300 to 650 simulated seconds
+    # per second at 25 ticks per second (batch.py: about 450 for earth and mars), short of the thousands aimed for:
+    # most of the time is the Python work per tank and per missile of a tick
+    state = {}
+    def new_match():
+        state["sim"] = simulation(planet, game.window_width, game.window_height, computer_tanks=(0, 1), seed=0)
+    new_match()
+    def run():
+        if state["sim"].winner is not None or state["sim"].clock.tick >= 2000:
+            new_match()
+        state["sim"].step()
+    return(run)
+
+def bench_frame(planet):
+    # a whole frame of the game: scripted input, simulation, drawing and flipping the display
+    # (the match starts again every 250 frames, so every measurement covers the same frames)
+    state = {"frame": 0}
+    def new_match():
+        state["sim"] = simulation(planet, game.window_width, game.window_height, seed=0)
+        state["view"] = game.match_view(state["sim"], planet)
+    new_match()
+    def run():
+        if state["sim"].winner is not None or state["frame"] % 250 == 0:
+            new_match()
+        events = state["sim"].step({0: SCRIPT[state["frame"] % len(SCRIPT)]})
+        state["view"].draw(events)
+        state["view"].present()
+        state["frame"] += 1
+    return(run)
+
+def benchmarks():
+    """
+    Returns the benchmarks of the hot paths of the game.
+
+    Returns:
+    - dict: Functions creating the benchmarks keyed by their names (every function returns the function to be timed).
+    """
+    cases = {}
+    for planet in PLANETS:
+        cases["func_to_ground/" + PLANETS[planet]] = lambda planet=planet: bench_func_to_ground(planet)
+    cases["heightmap/generate"] = lambda: bench_heightmap(1, False)
+    cases["heightmap/cached"] = lambda: bench_heightmap(1, True)
+    for radius in [6, 12, 24]:
+        cases[f"update_ground/r{radius}"] = lambda radius=radius: bench_update_ground(radius)
+    cases["settle"] = bench_settle
+    cases["draw_ground/full"] = lambda: bench_draw_ground(True)
+    cases["draw_ground/blit"] = lambda: bench_draw_ground(False)
+    for count in [1, 16, 256]:
+        cases[f"position_update/{count}"] = lambda count=count: bench_position_update(count)
+    for count in [1000, 30000]:
+        cases[f"particles/{count}"] = lambda count=count: bench_particles(count)
+    cases["falling"] = bench_falling
+    cases["gradient/30"] = bench_gradient
+    cases["aim_solver"] = bench_aim_solver
+    for planet in PLANETS:
+        cases["step/" + PLANETS[planet]] = lambda planet=planet: bench_step(planet)
+    for planet in PLANETS:
+        cases["frame/" + PLANETS[planet]] = lambda planet=planet: bench_frame(planet)
+    return(cases)
+
+def measure(func, repeat=5, min_time=0.2):
+    """
+    Times a function.
+
+    Parameters:
+    - func (function): The function to be timed.
+    - repeat (int, optional): Number of measurements.
+    - min_time (float, optional): Minimal duration of a measurement in seconds (the function is called as often as needed).
+
+    Returns:
+    - dict: Median and minimum of the measurements in microseconds per call and the number of calls per measurement.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times = np.array(timer.repeat(repeat, number)) / number * 1e6
+    return({"median_us": float(np.median(times)), "min_us": float(times.min()), "calls": number})
+
+def compare(results, baseline):
+    """
+    Compares results with a baseline.
+
+    Parameters:
+    - results (dict): Results as returned by measure keyed by the names of the benchmarks.
+    - baseline (dict): Results of an earlier run.
+
+    Returns:
+    - dict: Ratio of the medians (result / baseline) of every benchmark found in both.
+    """
+    return({name: results[name]["median_us"] / baseline[name]["median_us"] for name in results if name in baseline})
+
+def main(argv=None):
+    """
+    Runs the benchmarks, prints the results and compares them with a baseline.
+
+    Parameters:
+    - argv (list, optional): Command line arguments (sys.argv is used if None).
+
+    Returns:
+    - int: 1 if a benchmark is slower than the baseline allows, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the artillery game.")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="number of measurements per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimal duration of a measurement in seconds")
+    parser.add_argument("--output", metavar="PATH", help="write the results as JSON to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare the results with the JSON file of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown compared with the baseline (0.1 = 10 %%)")
+    args = parser.parse_args(argv)
+
+    # the game draws on the screen and writes text with its default font
+    pygame.init()
+    game.screen = pygame.display.set_mode((game.window_width, game.window_height))
+    game.font = pygame.font.Font(None, 36)
+
+    results = {}
+    for name, create in benchmarks().items():
+        if args.filter in name:
+            results[name] = measure(create(), args.repeat, args.min_time)
+            print(f"{name:<28}{results[name]['median_us']:>12.1f} us", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "video_driver": os.environ["SDL_VIDEODRIVER"],
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        print(f"{'benchmark':<28}{'baseline':>12}{'now':>12}{'ratio':>8}")
+        for name, ratio in compare(results, baseline).items():
+            slower = ratio > 1 + args.threshold
+            status |= slower
+            print(f"{name:<28}{baseline[name]['median_us']:>12.1f}{results[name]['median_us']:>12.1f}{ratio:>8.2f}"
+                  + ("  slower" if slower else ""))
+    return(int(status))
+
+if __name__ == "__main__":
+    sys.exit(main())
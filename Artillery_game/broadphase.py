@@ -0,0 +1,81 @@
+import numpy as np
+
+class uniform_grid:
+    """
+    Represents a uniform grid that sorts boxes (the hitboxes of the tanks) into cells, so that points (missiles)
+    only have to be tested against the boxes in their own cell.
+
+    The grid is built once per frame. Building and querying sort and search arrays of cell keys, so the cost grows
+    (almost) linearly with the number of boxes and points.
+
+    Attributes:
+    - cell_size (float): Minimal edge length of a cell in pixels.
+    - size (float): Edge length of the cells of the current grid (at least the size of the largest box).
+    - keys (numpy.ndarray): Sorted keys of the cells that are covered by a box.
+    - ids (numpy.ndarray): Index of the box covering the cell of the corresponding key.
+
+    Methods:
+    - __init__: Initializes a uniform_grid object.
+    - build: Sorts boxes into the cells of the grid.
+    - query: Returns the pairs of points and boxes that share a cell.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.size = cell_size
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.ids = np.zeros(0, dtype=np.intp)
+
+    def cell_key(self, x, y):
+        # cell coordinates are shifted such that negative coordinates (e.g. above the screen) get valid keys
+        cx = np.floor_divide(x, self.size).astype(np.int64) + 2**20
+        cy = np.floor_divide(y, self.size).astype(np.int64) + 2**20
+        return(cx * 2**21 + cy)
+
+    def build(self, boxes, margin):
+        """
+        Sorts boxes into the cells of the grid.
+
+        Parameters:
+        - boxes (numpy.ndarray): Boxes as rows [x, y, width, height].
+        - margin (float): Every box is enlarged by margin on each side (half the size of the objects tested against it).
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        x0 = boxes[:, 0] - margin
+        y0 = boxes[:, 1] - margin
+        x1 = boxes[:, 0] + boxes[:, 2] + margin
+        y1 = boxes[:, 1] + boxes[:, 3] + margin
+
+        # cells are at least as large as the boxes, so every box covers at most 2 x 2 cells
+        self.size = max(self.cell_size, float((x1 - x0).max(initial=0)), float((y1 - y0).max(initial=0)))
+        keys = self.cell_key(np.concatenate([x0, x1, x0, x1]), np.concatenate([y0, y0, y1, y1]))
+        ids = np.tile(np.arange(len(boxes)), 4)
+
+        # pairs (key, box) sorted by key (a box that covers only one cell is stored several times, 
+        # so a point can get the same candidate box more than once)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.ids = ids[order]
+
+    def query(self, points):
+        """
+        Returns the pairs of points and boxes that share a cell of the grid.
+
+        Parameters:
+        - points (numpy.ndarray): Points as rows [x, y].
+
+        Returns:
+        - tuple: Index of the point and index of the box of every candidate pair, sorted by the index of the point 
+          (pairs can occur more than once).
+        """
+        points = np.asarray(points).reshape(-1, 2)
+        keys = self.cell_key(points[:, 0], points[:, 1])
+        lo = np.searchsorted(self.keys, keys, side="left")
+        hi = np.searchsorted(self.keys, keys, side="right")
+        counts = hi - lo
+
+        # expand the ranges lo ... hi of every point into one array of candidate pairs
+        point_ids = np.repeat(np.arange(len(points)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        box_ids = self.ids[np.repeat(lo, counts) + offsets]
+        return(point_ids, box_ids)
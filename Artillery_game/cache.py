@@ -0,0 +1,85 @@
+import hashlib
+import os
+
+# directory of the tables, heightmaps and images saved on disk
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+def cache_path(prefix, key, extension):
+    """
+    Returns the path of a cached file. The name is derived from all parameters the content depends on, so a file
+    never has to be checked against its parameters and files of other parameters never collide.
+
+    Parameters:
+    - prefix (str): Kind of the content (e.g. "trajectory_").
+    - key (object): Parameters of the content, anything with a stable repr.
+    - extension (str): Extension of the file (e.g. ".npy").
+
+    Returns:
+    - str: Path of the file in CACHE_DIR.
+    """
+    name = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+    return(os.path.join(CACHE_DIR, prefix + name + extension))
+
+def read_cache(path, load):
+    """
+    Reads a cached file.
+
+    Parameters:
+    - path (str): Path of the file.
+    - load (function): Reads the content from the path.
+
+    Returns:
+    - object: The content returned by load, None if the file is missing or cannot be read.
+    """
+    if not os.path.exists(path):
+        return(None)
+    try:
+        content = load(path)
+    except Exception:
+        # a damaged file (e.g. left by a killed process) is a cache miss, it is replaced by the next write
+        return(None)
+    try:
+        # the time of the last use decides which files prune_cache removes
+        os.utime(path)
+    except OSError:
+        pass
+    return(content)
+
+def write_cache(path, save):
+    """
+    Writes a file into the cache. The content is written under another name first and then renamed, so other
+    processes either see the complete file or none.
+
+    Parameters:
+    - path (str): Path of the file.
+    - save (function): Writes the content into an open binary file.
+    """
+    temporary = path + "." + str(os.getpid()) + ".tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(temporary, "wb") as file:
+            save(file)
+        os.replace(temporary, path)
+    except Exception:
+        # the content is only kept in memory if the cache directory is not writable
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+def prune_cache(prefix, keep):
+    """
+    Removes the files of a kind that were used least recently, so the cache does not grow without limit.
+
+    Parameters:
+    - prefix (str): Kind of the files (as passed to cache_path).
+    - keep (int): Number of files that are kept.
+    """
+    try:
+        names = [name for name in os.listdir(CACHE_DIR) if name.startswith(prefix) and not name.endswith(".tmp")]
+        paths = sorted((os.path.join(CACHE_DIR, name) for name in names), key=os.path.getmtime, reverse=True)
+        for path in paths[keep:]:
+            os.remove(path)
+    except OSError:
+        # another process may remove the same files
+        pass
@@ -0,0 +1,44 @@
+class camera:
+    """
+    Represents the part of the world that is shown in the window.
+
+    The camera only moves horizontally. It follows a target column smoothly and never shows anything left or
+    right of the world, so a world as wide as the window is always shown completely.
+
+    Attributes:
+    - width (int): Width of the window in pixels.
+    - world_width (int): Width of the world in pixels.
+    - speed (float): Fraction of the distance to the target the camera moves per tick of the match.
+    - x (float): Column of the world at the left border of the window.
+
+    Methods:
+    - __init__: Initializes a camera object.
+    - clamp: Keeps a position of the camera inside the world.
+    - jump: Moves the camera to a target at once.
+    - follow: Moves the camera a bit towards a target.
+    - left: Returns the column of the world at the left border of the window.
+    """
+
+    def __init__(self, width, world_width, speed=0.15):
+        self.width = width
+        self.world_width = world_width
+        self.speed = speed
+        self.x = 0
+
+    def clamp(self, x):
+        return(min(max(x, 0), max(self.world_width - self.width, 0)))
+
+    def jump(self, target):
+        # the target is shown in the middle of the window (if the world is wide enough)
+        self.x = self.clamp(target - self.width / 2)
+
+    def follow(self, target, ticks=1.0):
+        # ticks: time since the last call in ticks of the match (frames may be drawn more often than ticks)
+        goal = self.clamp(target - self.width / 2)
+        self.x += (goal - self.x) * (1 - (1 - self.speed)**ticks)
+        # stop moving once the camera is close enough (the view is drawn at whole pixels)
+        if abs(goal - self.x) < 0.5:
+            self.x = goal
+
+    def left(self):
+        return(int(round(self.x)))
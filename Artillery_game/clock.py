@@ -0,0 +1,70 @@
+import time
+
+class tick_clock:
+    """
+    Represents the time of a simulation. The time advances by a fixed time step every frame (tick) instead of
+    following the wall clock, so a simulation can run as fast as possible and is reproducible.
+
+    Attributes:
+    - time_step (float): Simulated seconds per tick.
+    - tick (int): Number of ticks since the start of the simulation.
+
+    Methods:
+    - __init__: Initializes a tick_clock object.
+    - time: Returns the simulated time in seconds.
+    - advance: Advances the time by one tick.
+    """
+
+    def __init__(self, time_step=1 / 25):
+        self.time_step = time_step
+        self.tick = 0
+
+    def time(self):
+        return(self.tick * self.time_step)
+
+    def advance(self):
+        self.tick += 1
+
+class step_pacer:
+    """
+    Decides how many ticks of a simulation are due, so the simulation advances at its fixed time step while frames
+    are drawn at any rate (fixed time step with an accumulator).
+
+    Attributes:
+    - time_step (float): Seconds per tick.
+    - max_steps (int): Largest number of ticks simulated at once, after a longer break (e.g. while the window
+      was moved) the simulation does not try to catch up.
+    - accumulator (float): Seconds of wall clock time that have not been simulated yet.
+    - last (float): Time of the last call of advance in seconds.
+
+    Methods:
+    - __init__: Initializes a step_pacer object.
+    - reset: Starts counting the time anew.
+    - advance: Returns the number of ticks that are due.
+    - alpha: Returns the part of the next tick that has already passed.
+    """
+
+    def __init__(self, time_step, max_steps=5):
+        self.time_step = time_step
+        self.max_steps = max_steps
+        self.reset()
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last = time.perf_counter()
+
+    def advance(self):
+        now = time.perf_counter()
+        self.accumulator += now - self.last
+        self.last = now
+        steps = int(self.accumulator // self.time_step)
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.accumulator = self.accumulator % self.time_step
+        else:
+            self.accumulator -= steps * self.time_step
+        return(steps)
+
+    def alpha(self):
+        # used to draw the objects between their last two positions (the time since the last call of advance counts too)
+        return(min((self.accumulator + time.perf_counter() - self.last) / self.time_step, 1.0))
@@ -0,0 +1,137 @@
+import numpy as np
+from cache import cache_path, read_cache, write_cache, prune_cache
+from terrain import terrain
+
+# version of the generator, part of the name of the cached heightmaps (increase it when the generator changes)
+GENERATOR_VERSION = 1
+# number of saved heightmaps, the ones used least recently are removed
+HEIGHTMAP_CACHE_FILES = 16
+
+# parameters of the generated ground of every planet: mean height and largest deviation from it in pixels,
+# wavelength of the largest hills in pixels, number of octaves (each with half the wavelength) and the factor
+# by which the deviation of every octave shrinks
+NOISE_SETTINGS = {
+    1: {"base": 200, "amplitude": 200, "wavelength": 340, "octaves": 5, "persistence": 0.5},    # earth: rolling hills
+    2: {"base": 200, "amplitude": 110, "wavelength": 520, "octaves": 6, "persistence": 0.6},    # moon: flat but rough
+    3: {"base": 210, "amplitude": 280, "wavelength": 260, "octaves": 4, "persistence": 0.45},   # mars: steep mountains
+    4: {"base": 230, "amplitude": 180, "wavelength": 160, "octaves": 3, "persistence": 0.35},   # ice planet: smooth waves
+}
+
+def lattice_values(points, salt):
+    """
+    Returns a pseudo random value for every lattice point (the same point and salt always give the same value).
+
+    Parameters:
+    - points (numpy.ndarray): Non-negative integer coordinates of the lattice points.
+    - salt (int): Seed of the values.
+
+    Returns:
+    - numpy.ndarray: Values in [-1, 1].
+    """
+    # splitmix64 finalizer, the uint64 arithmetic wraps around
+    h = points.astype(np.uint64) + np.uint64(salt % 2**64)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    h = h ^ (h >> np.uint64(31))
+    # the highest 53 bits give a float in [0, 1)
+    return((h >> np.uint64(11)).astype(np.float64) / 2.0**53 * 2 - 1)
+
+def fractal_noise(x, seed, wavelength, octaves, persistence):
+    """
+    Computes one-dimensional value noise summed over several octaves for all x at once.
+
+    Parameters:
+    - x (numpy.ndarray): Non-negative coordinates in pixels.
+    - seed (int): Seed of the noise.
+    - wavelength (float): Distance of the lattice points of the first octave in pixels.
+    - octaves (int): Number of octaves, every octave halves the distance of the lattice points.
+    - persistence (float): Factor by which the amplitude shrinks from one octave to the next.
+
+    Returns:
+    - numpy.ndarray: Noise in [-1, 1].
+    """
+    total = np.zeros(len(x))
+    amplitude = 1.0
+    amplitudes = 0.0
+    for octave in range(octaves):
+        position = x / (wavelength / 2**octave)
+        cell = np.floor(position)
+        fraction = position - cell
+        # smoothstep between the values of the neighboring lattice points
+        weight = fraction * fraction * (3 - 2 * fraction)
+        salt = seed * 0x9E3779B97F4A7C15 + octave * 0xD1B54A32D192ED03
+        left = lattice_values(cell, salt)
+        right = lattice_values(cell + 1, salt)
+        total += amplitude * (left + (right - left) * weight)
+        amplitudes += amplitude
+        amplitude *= persistence
+    return(total / amplitudes)
+
+def generate_heightmap(planet, seed, c0, c1, height):
+    """
+    Generates the ground of a planet from noise. The noise of a column only depends on its position, so any range
+    of columns can be generated on its own (e.g. a chunk of the terrain when it is needed).
+
+    Parameters:
+    - planet (int): The chosen planet (selects the settings in NOISE_SETTINGS).
+    - seed (int): Seed of the ground.
+    - c0 (int): First column.
+    - c1 (int): Column after the last one.
+    - height (int): Height of the ground in pixels.
+
+    Returns:
+    - numpy.ndarray: int16 array with the row of the topmost ground pixel of every column.
+    """
+    settings = NOISE_SETTINGS[planet]
+    noise = fractal_noise(np.arange(c0, c1), seed, settings["wavelength"], settings["octaves"], settings["persistence"])
+    # the ground never fills more than the lower half, so there is room to fire above it
+    m = np.clip((settings["base"] + settings["amplitude"] * noise).astype(np.int64), 10, height // 2)
+    return((height - m).astype(np.int16))
+
+def load_heightmap(planet, seed, width, height):
+    """
+    Returns the generated ground of a planet. Every heightmap is generated once and saved in CACHE_DIR under
+    a name derived from all parameters of the generator. Saved heightmaps are memory-mapped, so only the parts
+    that are used are read. Only the HEIGHTMAP_CACHE_FILES heightmaps used last are kept.
+
+    Parameters:
+    - planet (int): The chosen planet.
+    - seed (int): Seed of the ground.
+    - width (int): Width of the ground in pixels.
+    - height (int): Height of the ground in pixels.
+
+    Returns:
+    - numpy.ndarray: Read-only int16 array as returned by generate_heightmap.
+    """
+    key = (GENERATOR_VERSION, sorted(NOISE_SETTINGS[planet].items()), int(seed), int(width), int(height))
+    path = cache_path("heightmap_", key, ".npy")
+    top = read_cache(path, lambda path: np.load(path, mmap_mode="r"))
+    if top is not None:
+        return(top)
+
+    top = generate_heightmap(planet, seed, 0, width, height)
+    write_cache(path, lambda file: np.save(file, top))
+    prune_cache("heightmap_", HEIGHTMAP_CACHE_FILES)
+    top.flags.writeable = False
+    return(top)
+
+def heightmap_to_ground(planet, seed, width, height, cached=False):
+    """
+    Creates a terrain object with generated ground. The columns of a chunk of the terrain are generated (or copied 
+    from the saved heightmap) when the chunk is needed.
+
+    Parameters:
+    - planet (int): The chosen planet.
+    - seed (int): Seed of the ground.
+    - width (int): Width of the ground in pixels.
+    - height (int): Height of the ground in pixels.
+    - cached (bool, optional): If True the heightmap is saved in CACHE_DIR (see load_heightmap), for grounds that
+      are loaded again. Every match has a new seed, so its ground is only generated.
+
+    Returns:
+    - terrain: Terrain object representing the ground.
+    """
+    if cached:
+        top = load_heightmap(planet, seed, width, height)
+        return(terrain(lambda c0, c1: top[c0:c1], width, height))
+    return(terrain(lambda c0, c1: generate_heightmap(planet, seed, c0, c1, height), width, height))
@@ -1,560 +1,834 @@
 import pygame
-import pygame.gfxdraw
 import numpy as np 
-import math 
-from tank import tank, AI_enemy
+from simulation import simulation, MOVE_LEFT, MOVE_RIGHT, MOVE_STOP, ANGLE_UP, ANGLE_DOWN, SHOOT
+from tank import ANGLES
+from trajectory import trajectory_table
+from sprites import sprite_atlas
+from camera import camera
+from particles import particle_pool, SMOKE, DIRT, DEBRIS
+from profiler import frame_profiler
+from clock import step_pacer
+from replay import recording, replay_player
+from net import lockstep_peer
+import argparse
+import atexit
+import os
+import random
 import sys
+import threading
 import time
+from functools import lru_cache
     
 # window size
 window_width, window_height = [int(620 * 1.5), int(480 * 1.5)] 
 
-def integer_ball(ground, point,radius):
-    """
-    Returns a list of points within a specified radius around a given point on the ground grid.
+# width of the world of a match (wider worlds scroll, set with --world-width)
+world_width = window_width
+# generate the ground of every match from noise instead of the planet functions (set with --procedural)
+procedural = False
+# loose ground above craters falls down (set with --settling)
+settling = False
+# the computer aims at the player with the aim solver instead of shooting at random (set with --aiming)
+aiming = False
+# frames drawn per second at most, 0 draws as many as possible (set with --max-fps), the match itself always
+# advances by 25 ticks per second. The default is the refresh rate of most displays (pygame can not query it), 
+# where vsync works the display paces the frames anyway
+max_fps = 60
+# simulate the match in a thread of its own (set with --sim-thread)
+threaded = False
+
+# phases of a frame measured by the profiler (enabled with --profile, F3 shows the overlay)
+# (background and ground are drawn into the composite, restore copies the composite to the screen)
+PHASES = ["events", "ai", "tanks", "missiles", "background", "ground", "restore", "hud", "effects", "overlay", "flip", "wait"]
+profiler = frame_profiler(PHASES, enabled=False)
+
+# every match is recorded into this directory (see replay.py)
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replays")
 
-    Parameters:
-        ground (numpy.ndarray): 2D numpy array representing the ground.
-        point (tuple): Tuple containing the coordinates of the center point.
-        radius (int): Integer specifying the radius of the circle around the center point.
+def current_fraction_of_second():
+    """
+    Calculates the current fraction of a second.
 
     Returns:
-        list: List of points (tuples) within the specified radius.
+        float: Fraction of the current second.
     """
-
-    points = []
-    for i in range(point[0] - radius, point[0] + radius + 1):
-        for j in range(point[1] - radius, point[1] + radius + 1):
-            if 0 <= i < ground.shape[0] - 1 and j < ground.shape[1]:
-                if math.sqrt((i - point[0])**2 + (j - point[1])**2) <= radius:
-                    points.append((i, j))
-    return points
-
-def collision(rect1, rect2):
+    # Get the current time in seconds
+    current_time = time.time()
+    # Get the fraction of the current second
+    fraction_of_second = current_time - int(current_time)
+    return fraction_of_second
+                
+class ground_layer:
     """
-    Checks if two rectangles overlap.
-
-    Parameters:
-        rect1 (list): List containing the coordinates and dimensions of the first rectangle [x, y, width, height].
-        rect2 (list): List containing the coordinates and dimensions of the second rectangle [x, y, width, height].
-
-    Returns:
-        bool: Boolean value indicating whether the rectangles overlap.
+    Represents the rendered ground. Every visible chunk of the terrain is rendered onto its own surface,
+    which is kept between frames until the chunk is no longer near the window.
+
+    Attributes:
+    - ground (terrain): Terrain object that is drawn.
+    - col (tuple): Color of the ground.
+    - surfaces (dict): Surfaces of the rendered chunks with the color of the ground, transparent above the ground,
+      keyed by the number of the chunk.
+
+    Methods:
+    - __init__: Initializes a ground_layer object.
+    - fill: Draws a range of columns into the surface of a chunk.
+    - rasterize: Renders the visible chunks and redraws the columns that changed since the last frame.
     """
 
-    # extract coordinates and dimensions of rectangles
-    x1, y1 = rect1[0] # upper left coordinates of rectangle 1
-    w1, h1 = rect1[1:] # length and height of rectangle 1
-    x2, y2 = rect2[0] # upper left coordinates of rectangle 2
-    w2, h2 = rect2[1:] # length and height of rectangle 2
-
-    # check overlap along x-axis
-    overlap_x = (x1 < x2 + w2) and (x2 < x1 + w1)
-
-    # check overlap along y-axis
-    overlap_y = (y1 < y2 + h2) and (y2 < y1 + h1)
-
-    # Return True if rectangles overlap both along x-axis and y-axis
-    return(overlap_x and overlap_y)
-
-def func_to_ground(f): 
+    def __init__(self, ground, col):
+        self.ground = ground
+        self.col = col
+        self.surfaces = {}
+
+    def fill(self, k, c0, c1): 
+        surface = self.surfaces[k]
+        origin = k * self.ground.chunk_width
+        mask = self.ground.mask(c0, c1)
+        # the free pixel above every ground pixel is drawn too (as the outline of the ground)
+        mask[:, :-1] |= mask[:, 1:]
+        alpha = pygame.surfarray.pixels_alpha(surface) # indexed by [column, row]
+        alpha[c0 - origin:c1 - origin] = mask * 255
+        del alpha # unlock the surface
+
+    def rasterize(self, first, last):
+        """
+        Renders the chunks first ... last and forgets the surfaces of the chunks far from them.
+
+        Parameters:
+        - first (int): Number of the leftmost visible chunk.
+        - last (int): Number of the rightmost visible chunk.
+        """
+        chunk_width = self.ground.chunk_width
+        # columns changed by craters (chunks without a surface are rendered completely once they are visible)
+        for c0, c1 in self.ground.dirty: 
+            for k in range(c0 // chunk_width, (c1 - 1) // chunk_width + 1): 
+                if k in self.surfaces: 
+                    self.fill(k, max(c0, k * chunk_width), min(c1, (k + 1) * chunk_width))
+        self.ground.dirty.clear()
+
+        for k in range(first, last + 1): 
+            if k not in self.surfaces: 
+                c0 = k * chunk_width
+                c1 = min(c0 + chunk_width, self.ground.width)
+                self.surfaces[k] = pygame.Surface((c1 - c0, self.ground.height), pygame.SRCALPHA).convert_alpha()
+                self.surfaces[k].fill(self.col)
+                self.fill(k, c0, c1)
+        # one chunk on each side is kept, so a camera moving back and forth does not render them again and again
+        for k in [k for k in self.surfaces if not first - 1 <= k <= last + 1]: 
+            del self.surfaces[k]
+
+def draw_ground(layer, left=0, surface=None): 
     """
-    Converts a given function to a ground matrix.
+    Draws the ground on the screen (or another surface of the size of the window).
 
     Parameters:
-        f (function): Function representing the ground profile.
-
-    Returns:
-        numpy.ndarray: 2D numpy array representing the ground matrix.
-    """
-    ground = np.zeros((window_height, window_width))
-    n = 0
-    for x in range(0, window_width): 
-        m = int(f(x)) 
-        if m < 1: 
-            ground[:,n] = 0
-        else: 
-            ground[-m:, n] = 1 # set row (of pixels) beneath function value to 1 
-        n = n + 1
-    return(ground)
-
-def update_ground(miss, ground, destruction_radius): 
+        layer (ground_layer): Rendered ground, only the visible chunks are rendered and only the columns
+          changed by craters are redrawn.
+        left (int, optional): Column of the world at the left border of the window.
+        surface (pygame.Surface, optional): Surface the ground is drawn on (the screen if None).
     """
-    Updates the ground matrix based on the impact of a missile.
-
-    Parameters:
-        miss (missile): Missile object representing the missile.
-        ground (numpy.ndarray): 2D numpy array representing the ground.
-        destruction_radius (int): Integer specifying the radius of destruction caused by the missile.
-
-    Returns:
-        bool: Boolean value indicating whether the ground was updated due to the missile impact.
+    surface = screen if surface is None else surface
+    chunk_width = layer.ground.chunk_width
+    first = left // chunk_width
+    last = (min(left + window_width, layer.ground.width) - 1) // chunk_width
+    layer.rasterize(first, last)
+    for k in range(first, last + 1): 
+        surface.blit(layer.surfaces[k], (k * chunk_width - left, 0))
+
+def draw_aim_preview(panzer, table, ground, col, left=0, position=None): 
     """
-    
-    m = int(miss.position[0]) 
-    n = int(miss.position[1]) 
+    Draws the flight path of a missile fired by a tank at its current angle as a dotted arc.
 
-    # indicates that missile is out of screen
-    if not (0 <= m < np.shape(ground)[1] - 2  and n < np.shape(ground)[0] - 2): 
-        return(True)
-
-    # set ground to zero where it was hit by the missile
-    if n > 2 and 1 in [ground[k,j] for k in range((n-2), (n+3)) for j in range((m-2), (m+3))]:
-        bombed_area = integer_ball(ground, [n,m], destruction_radius)
-        rows, cols = zip(*bombed_area)
-        ground[rows,cols] = 0
-
-        return(True)
-    else: 
-        return(False)
-    
-def ground_earth(x): 
-    """
-    Calculates the height of the ground at a given x-coordinate on Earth.
+    The flight path is a slice of the trajectory table, it ends where the missile would hit the ground.
 
     Parameters:
-    - x (float): The x-coordinate at which to calculate the height of the ground.
+    - panzer (tank): The tank that aims.
+    - table (numpy.ndarray): Trajectory table of the planet (see trajectory.py).
+    - ground (terrain): Terrain object representing the ground.
+    - col (tuple): Color of the dots.
+    - left (int, optional): Column of the world at the left border of the window.
+    - position (numpy.ndarray, optional): Position the tank is drawn at (its position if None).
 
     Returns:
-    - float: The height of the ground at the specified x-coordinate on Earth.
+    - list: Rectangles of the dots on the screen.
     """
-    return(60 * np.sin(x / 45) + 150 + 0.12*x)
-
-def ground_moon(x): 
+    position = panzer.position if position is None else position
+    # every third position of the flight path, starting where the missile is first drawn
+    points = position + np.array([0, - 15]) + table[panzer.frame - 1, 2::3] * [panzer.facing, 1]
+    columns = points[:, 0].astype(int)
+    inside = (0 <= columns) & (columns < ground.width)
+    landed = ~inside | (points[:, 1] >= ground.surfaces(np.clip(columns, 0, ground.width - 1)) - 1)
+    end = landed.argmax() if landed.any() else len(points)
+    return([pygame.draw.circle(screen, col, (int(x) - left, int(y)), 2) for x, y in points[:end]])
+
+def draw_profiler_overlay(profiler): 
     """
-    Calculates the height of the ground at a given x-coordinate on the Moon.
+    Draws the median and 99th percentile of the frame time and of every phase over the last frames.
 
     Parameters:
-    - x (float): The x-coordinate at which to calculate the height of the ground.
+    - profiler (frame_profiler): The profiler of the game.
 
     Returns:
-    - float: The height of the ground at the specified x-coordinate on the Moon.
+    - pygame.Rect: Area of the overlay on the screen.
     """
-    return(- 10**(-3.6) * (x-480)**2 + 200 - 5 * np.sin(x / 25))
-
-def ground_mars(x):
+    p50, p99 = profiler.statistics()
+    small_font = get_font(20)
+    lines = [f"{'frame':<11}{p50[0]:>7.2f}{p99[0]:>7.2f} ms"]
+    lines += [f"{phase:<11}{median:>7.2f}{high:>7.2f}" for phase, median, high in zip(profiler.phases, p50[1:], p99[1:])]
+
+    # the numbers change every frame, so they are not kept in the text cache
+    background = pygame.Surface((190, 16 * len(lines) + 30), pygame.SRCALPHA)
+    background.fill((0, 0, 0, 160))
+    rect = screen.blit(background, (10, 180))
+    screen.blit(small_font.render("phase        p50    p99", True, (255, 255, 255)), (15, 185))
+    for k, line in enumerate(lines): 
+        screen.blit(small_font.render(line, True, (255, 255, 255)), (15, 205 + 16 * k))
+    return(rect)
+
+@lru_cache(maxsize=None)
+def load_background(path): 
+    # every background is loaded and scaled to the window once, the scenes share it
+    return(pygame.transform.scale(pygame.image.load(path), (window_width, window_height)).convert())
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    # one font object per size, creating a font loads and scales the font file
+    return(pygame.font.Font(None, size))
+
+@lru_cache(maxsize=128)
+def render_text(text, font, color):
     """
-    Calculates the height of the ground at a given x-coordinate on Mars.
+    Renders text into a surface. The last rendered surfaces are kept, so a label that does not change
+    is only rendered once (the cache is bounded, so changing texts like the score do not fill the memory).
 
     Parameters:
-    - x (float): The x-coordinate at which to calculate the height of the ground.
+    - text (str): The text to be rendered.
+    - font (pygame.font.Font): The font object to render the text.
+    - color (tuple): The color of the text in RGB format.
 
     Returns:
-    - float: The height of the ground at the specified x-coordinate on Mars.
+    - pygame.Surface: The rendered text.
     """
-    return(150 + 40 * np.sin(x / 80) + 30 * np.cos(x / 30) + 15 * np.sin(x / 300) ) 
+    return(font.render(text, True, color))
 
-def ground_ice(x):
+def draw_text(text, font, color, x, y, size=None):
     """
-    Calculates the height of the ground at a given x-coordinate on an ice planet.
+    Renders text on the screen.
 
     Parameters:
-    - x (float): The x-coordinate at which to calculate the height of the ground.
+    - text (str): The text to be rendered.
+    - font (pygame.font.Font): The font object to render the text.
+    - color (tuple): The color of the text in RGB format.
+    - x (int): The x-coordinate of the text.
+    - y (int): The y-coordinate of the text.
+    - size (int, optional): The font size. If None, the font size of the provided font is used.
 
     Returns:
-    - float: The height of the ground at the specified x-coordinate on the ice planet.
+    - pygame.Rect: Area of the text on the screen.
     """
-    # Define the range of y values
-    y_min = 150
-    y_max = 400
-    
-    # Normalize x to the range [0, period)
-    x_normalized = x % 60
-    
-    # Map x_normalized to the range [y_min, y_max]
-    return( y_min + 0.5 * (y_max - y_min) * (x_normalized / 100)  + 20 * np.cos(x / 30))
+    if size:
+        font = get_font(size)
+    text_surface = render_text(text, font, tuple(color))
+    text_rect = text_surface.get_rect()
+    text_rect.center = (x, y)
+    return(screen.blit(text_surface, text_rect))
 
-def current_fraction_of_second():
-    """
-    Calculates the current fraction of a second.
 
-    Returns:
-        float: Fraction of the current second.
+class match_view: 
     """
-    # Get the current time in seconds
-    current_time = time.time()
-    # Get the fraction of the current second
-    fraction_of_second = current_time - int(current_time)
-    return fraction_of_second
-                
-def pixel_to_position(n,m):
+    Draws the state of a match: background, ground, aim preview, score, tanks with their life bars and missile 
+    indicators, missiles and explosions (with smoke, dirt and debris particles).
+
+    Background and ground are composed once into a surface of the size of the window. Every frame only the parts
+    of the screen drawn over in the last frame and the columns changed by craters are restored from it, and only
+    those parts and the ones drawn in the current frame are shown (the whole window only when the camera moved).
+
+    Attributes:
+    - sim (simulation): The match that is drawn.
+    - player (int): Number of the tank of the player in front of the screen (gets the aim preview).
+    - col_ground (tuple): Color of the ground.
+    - col_score (tuple): Color of the score and the aim preview.
+    - background (pygame.Surface): Background image scaled to the window.
+    - layer (ground_layer): The rendered ground.
+    - table (numpy.ndarray): Flight paths of the missiles for the aim preview.
+    - atlases (list): Images of every tank for all angles of the cannon.
+    - hud_spacing (float): Horizontal distance between the life bars / missile indicators of the tanks.
+    - score_row (int): Row of the center of the score.
+    - camera (camera): The part of the world shown in the window, it follows the player and the missiles of the player.
+    - particles (particle_pool): Smoke, dirt and debris thrown by the explosions.
+    - composite (pygame.Surface): Background and ground as seen from the camera.
+    - composite_left (int): Column of the world at the left border of the composite (None before the first frame).
+    - rects (list): Parts of the screen drawn over in the current frame (others can add theirs before present).
+    - previous (list): Parts of the screen drawn over in the last frame.
+    - full (bool): If True the whole window is restored and shown in the current frame.
+    - tank_positions (numpy.ndarray): Positions of the tanks before the last tick (None if they are not interpolated).
+    - alpha (float): Part of the next tick that had passed when the last frame was drawn.
+    - flashes (list): Explosions that are shown as [position, remaining ticks].
+
+    Methods:
+    - __init__: Initializes a match_view object.
+    - focus: Returns the column the camera follows.
+    - remember: Saves the positions of the tanks before a tick.
+    - compose: Updates the composite and restores the parts of the screen drawn over in the last frame.
+    - draw: Draws a frame of the match.
+    - present: Shows the parts of the screen that changed.
     """
-    Converts pixel coordinates to position coordinates.
-
-    Parameters:
-        n (int): Pixel coordinate along the x-axis.
-        m (int): Pixel coordinate along the y-axis.
 
-    Returns:
-        numpy.ndarray: Numpy array containing the position coordinates.
-    """
-    pos = np.array([n, m])
-    return(pos)
+    COL_MISSILES_ACTIVE = (255, 153,51)
+    COL_MISSILES_INACTIVE = (160, 160, 160)
+    EXPLOSION = (255, 153, 51)
+    SMOKE = ((70, 70, 70), (200, 200, 200))
+    DEBRIS = ((255, 230, 120), (90, 90, 90))
+
+    def __init__(self, sim, planet, player=0): 
+        # settings depending on the chosen planet 
+        if planet == 1: 
+            # earth 
+            self.col_ground = ( 76, 153, 0)
+            self.col_score = (0, 0, 0)
+            path_background_img = "backgrounds/background_earth.jpg"
+        elif planet == 2: 
+            # moon
+            self.col_ground = (128, 128, 128)
+            self.col_score = (255, 255, 255)
+            path_background_img = "backgrounds/background_moon.jpg"
+        elif planet == 3: 
+            # mars
+            self.col_ground = (204, 102, 0)
+            self.col_score = (0,0,0)
+            path_background_img = "backgrounds/background_mars.jpg"
+        else:
+            # ice planet 
+            self.col_ground = (185, 242, 255)
+            self.col_score = (255,255,51)
+            path_background_img = "backgrounds/background_ice.jpg"
+
+        self.sim = sim
+        self.player = player
+        self.layer = ground_layer(sim.ground, self.col_ground)
+
+        # flight paths of the missiles for the aim preview
+        self.table = trajectory_table(sim.g, sim.vel_norm, sim.height, ANGLES)
+
+        # images of the tanks for all angles of the cannon, facing the direction the tank shoots to
+        self.atlases = [sprite_atlas("player" if panzer.counter == 0 else "computer", ANGLES, panzer.facing) for panzer in sim.tanks]
+
+        # horizontal distance between the life bars / missile indicators of the tanks
+        self.hud_spacing = 1 / max(len(sim.tanks) - 1, 1)
+        # with more than two tanks there are life bars in the middle, the score is shown beneath them
+        self.score_row = 40 if len(sim.tanks) <= 2 else 190
+
+        # Load the background image
+        self.background = load_background(path_background_img)
+
+        self.camera = camera(window_width, sim.width)
+        self.camera.jump(self.focus())
+
+        # dirt has the color of the ground and gets darker
+        self.particles = particle_pool({SMOKE: self.SMOKE, DIRT: (self.col_ground, tuple(c // 2 for c in self.col_ground)), 
+                                        DEBRIS: self.DEBRIS})
+
+        self.composite = pygame.Surface((window_width, window_height)).convert()
+        self.composite_left = None
+        self.rects = []
+        self.previous = []
+        self.full = True
+
+        # frames can be drawn between two ticks, the tanks and missiles are drawn between their last two positions
+        self.tank_positions = None
+        self.alpha = 1.0
+        self.flashes = []
+
+    def focus(self): 
+        # the last missile fired by the player while it is in the air, otherwise the tank of the player
+        missiles = self.sim.missiles
+        own = np.flatnonzero(missiles.owner[:missiles.count] == self.player)
+        if len(own): 
+            return(missiles.position[own[-1], 0])
+        return(self.sim.tanks[self.player].position[0])
+
+    def remember(self): 
+        # called before every tick, the missiles keep their previous positions themselves
+        self.tank_positions = np.array([panzer.position for panzer in self.sim.tanks], dtype=float)
+
+    def compose(self, left): 
+        """
+        Updates the composite of background and ground (all of it if the camera moved, otherwise the columns changed
+        by craters) and restores the parts of the screen drawn over in the last frame from it.
+
+        Parameters:
+        - left (int): Column of the world at the left border of the window.
+        """
+        if left != self.composite_left: 
+            self.composite_left = left
+            self.full = True
+        if self.full: 
+            area = self.composite.get_rect()
+        else: 
+            # columns of the window changed by craters (they are forgotten once the ground is drawn)
+            changed = [pygame.Rect(c0 - left, 0, c1 - c0, window_height).clip(self.composite.get_rect()) 
+                       for c0, c1 in self.sim.ground.dirty]
+            changed = [rect for rect in changed if rect.width > 0]
+            area = changed[0].unionall(changed[1:]) if changed else pygame.Rect(0, 0, 0, 0)
+            self.previous.append(area)
+
+        # the ground is drawn even if nothing changed in the window, so the chunks are rendered
+        self.composite.set_clip(area)
+        self.composite.blit(self.background, (0, 0))
+        profiler.mark("background")
+        draw_ground(self.layer, left, self.composite)
+        self.composite.set_clip(None)
+        profiler.mark("ground")
+
+        if self.full: 
+            screen.blit(self.composite, (0, 0))
+        else: 
+            for rect in self.previous: 
+                screen.blit(self.composite, rect, rect)
+        profiler.mark("restore")
+
+    def draw(self, events, steps=1, alpha=1.0): 
+        """
+        Draws a frame of the match on the screen. The frame is shown by present.
+
+        Parameters:
+        - events (list): Events of the ticks since the last frame as returned by simulation.step (explosions are drawn for them).
+        - steps (int, optional): Number of ticks simulated since the last frame.
+        - alpha (float, optional): Part of the next tick that has already passed (0 draws the tanks and missiles at
+          their positions before the last tick, 1 at their current positions).
+        """
+        sim = self.sim
+        # time since the last frame in ticks (camera, particles and explosions move by it)
+        ticks = max(steps + alpha - self.alpha, 0)
+        self.alpha = alpha
+
+        # positions the tanks and missiles are drawn at, tanks that were set back to their spawn jump there
+        tank_positions = np.array([panzer.position for panzer in sim.tanks], dtype=float)
+        if self.tank_positions is not None and alpha < 1: 
+            moved = np.abs(tank_positions - self.tank_positions).max(axis=1) < 30
+            tank_positions[moved] += (alpha - 1) * (tank_positions[moved] - self.tank_positions[moved])
+        missiles = sim.missiles
+        missile_positions = missiles.position[:missiles.count]
+        if alpha < 1: 
+            missile_positions = missiles.position_prev[:missiles.count] + alpha * (missile_positions - missiles.position_prev[:missiles.count])
+
+        self.camera.follow(self.focus(), ticks)
+        left = self.camera.left()
+        offset = np.array([left, 0])
+        rects = self.rects
+
+        self.compose(left)
+
+        # chunks of the terrain far from the window, the tanks and the missiles are forgotten
+        chunk_width = sim.ground.chunk_width
+        needed = set(range(left // chunk_width - 1, (left + window_width) // chunk_width + 2))
+        needed.update(int(panzer.position[0]) // chunk_width for panzer in sim.tanks)
+        needed.update((sim.missiles.position[:sim.missiles.count, 0].astype(int) // chunk_width).tolist())
+        sim.ground.release(needed)
+
+        # dotted flight path of the missile the player would fire
+        rects.extend(draw_aim_preview(sim.tanks[self.player], self.table, sim.ground, self.col_score, left, tank_positions[self.player]))
 
-def draw_smooth_rect(screen, color, x, y, width, height):
-    """
-    Draws a smoothed rectangle on the screen.
+        # show score
+        rects.append(draw_text(sim.score(), font, self.col_score, window_width // 2, self.score_row, size = 55))
+ 
+        for panzer in sim.tanks: 
+            # show imagine of tank
+            x, y = tank_positions[panzer.counter]
+            rects.append(self.atlases[panzer.counter].draw(screen, panzer.frame, (x - 20 - left, y - 50)))
+            
+            # setting up colors of available / unavailable missiles
+            col_missiles = [self.COL_MISSILES_ACTIVE for _ in range(3)]
 
-    Parameters:
-        screen (pygame.Surface): Pygame display surface.
-        color (tuple): Color of the rectangle.
-        x (int): x-coordinate of the top-left corner of the rectangle.
-        y (int): y-coordinate of the top-left corner of the rectangle.
-        width (int): Width of the rectangle.
-        height (int): Height of the rectangle.
-    """
+            if panzer.num_missiles == 0: 
+                col_missiles[0:3] = [self.COL_MISSILES_INACTIVE] * 3
+            elif panzer.num_missiles == 1: 
+                col_missiles[0:2] = [self.COL_MISSILES_INACTIVE] * 2 
+            elif panzer.num_missiles == 2:
+                col_missiles[0:1] = [self.COL_MISSILES_INACTIVE] * 1
+    
+            # drawing of the 3 available / unavailable missiles 
+            for k in range(3): 
+                x_missiles = 10 + panzer.counter * self.hud_spacing * (window_width - 55)
+                pygame.draw.ellipse(screen, col_missiles[k], [x_missiles, 50 + k * 40,35,25]) # inner ellipse
+                rects.append(pygame.draw.ellipse(screen, (204,102,0), [x_missiles, 50 + k * 40,35,25], 2))  # outer ellipse 
 
-    # Function to draw a smoothed rectangle
-    pygame.gfxdraw.filled_polygon(screen, [(x, y), (x + width, y), (x + width, y + height), (x, y + height)], color)
-    #pygame.gfxdraw.aapolygon(screen, [(x, y), (x + width, y), (x + width, y + height), (x, y + height)], color)
+            # life bar - constists of a grey and a red bar
+            x_life = 10 + panzer.counter * self.hud_spacing * (window_width - 120)
+            # grey bar
+            rects.append(pygame.draw.rect(screen, (192, 192, 192), [x_life, 10, 100, 25]))
+            # red bar (aligned to the side the tank is facing away from)
+            pygame.draw.rect(screen, (210,0,0), [x_life + (100 - panzer.life) * (panzer.facing == -1), 10, panzer.life, 25])
+        profiler.mark("hud")
+
+        # draw every missile that is in the air 
+        for position in missile_positions: 
+            rects.append(pygame.draw.circle(screen, ( 255, 0, 0), position - offset, 10, 10))
+
+        # draw explosions of missiles that hit a tank or the ground (for one tick), they throw debris or dirt and smoke
+        for kind, position in events: 
+            if kind == "hit": 
+                self.flashes.append([position + [4, - 4], 1.0])
+                self.particles.emit(DEBRIS, position[0] + 4, position[1] - 4, 150)
+                self.particles.emit(SMOKE, position[0] + 4, position[1] - 4, 80, 2 * np.pi)
+            elif kind == "crater": 
+                self.flashes.append([position, 1.0])
+                self.particles.emit(DIRT, position[0], position[1], 200, 0.6 * np.pi)
+                self.particles.emit(SMOKE, position[0], position[1], 60)
+        for position, remaining in self.flashes: 
+            rects.append(pygame.draw.circle(screen, self.EXPLOSION, position - offset, 20, 10))
+        self.flashes = [[position, remaining - ticks] for position, remaining in self.flashes if remaining > ticks]
+        self.particles.update(ticks)
+        area = self.particles.draw(screen, left)
+        if area is not None: 
+            rects.append(area)
+        profiler.mark("effects")
+
+    def present(self): 
+        # the parts drawn over in the last frame are shown too, the things drawn there have moved away
+        if self.full: 
+            pygame.display.flip()
+        else: 
+            pygame.display.update(self.previous + self.rects)
+        self.previous = self.rects
+        self.rects = []
+        self.full = False
 
-def draw_ground(ground, col): 
+def save_recording(record): 
     """
-    Draws the ground on the screen.
+    Saves the record of a match in REPLAY_DIR, named after the current date and time.
 
     Parameters:
-        ground (numpy.ndarray): 2D numpy array representing the ground.
-        col (tuple): Color of the ground.
+    - record (recording): The record of the match.
     """
-    # draw every column of the ground starting from the first (from buttom) 0 in ground matrix column 
-    for m in range(0, ground.shape[1]):
-        n = np.where(ground[:, m] == 0)[0][-1]
-        ground[0:n, m] = 0
-        y_rect, x_rect = pixel_to_position(n,m)
-        draw_smooth_rect(screen, col, x_rect, y_rect, block_size, (ground.shape[0] - n))
+    try:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        record.save(os.path.join(REPLAY_DIR, time.strftime("match_%Y%m%d_%H%M%S.rpl")))
+    except OSError:
+        print("The match could not be recorded.")
 
-def gradient(tank_pos, move_direction, ground):
+def player_input(turning): 
     """
-    Calculates the gradient (slope) of the ground at the current position of the tank.
+    Translates the keys pressed by the player into the action of the player tank.
 
     Parameters:
-    - tank_pos (tuple): A tuple containing the current position of the tank in the form (x, y).
-    - move_direction (int): The direction in which the tank is moving (-1 for left, 1 for right).
-    - ground (numpy.ndarray): An array representing the ground terrain.
+    - turning (int): ANGLE_UP / ANGLE_DOWN while the up / down arrow is held, 0 otherwise.
 
     Returns:
-    - float: The gradient (slope) of the ground at the current position of the tank.
+    - tuple: The action (action flags of simulation.py combined with |), the new value of turning and 
+      whether the player closed the game.
     """
-    # x coordinate 4 steps in moving direction (less than 4 steps yields low variability in gradient values)
-    column_tank = int(tank_pos[0]) + 4 * move_direction
-    # new height of tank
-    y_tank = np.nonzero(ground[:, column_tank])[0][0] 
-    # increase / decrease in height of tank (when going 4 steps / pixel in moving direction)
-    gradient = -(y_tank - tank_pos[1])
-    return(gradient)
-
-def moving_speed(grad_tank): 
+    action = 0
+    for event in pygame.event.get():
+        # quiting game
+        if event.type == pygame.QUIT:
+            return(action, turning, True)
+        if event.type == pygame.KEYDOWN:
+
+            # keys for player
+            if event.key == pygame.K_RIGHT:
+                action = action & ~(MOVE_LEFT | MOVE_STOP) | MOVE_RIGHT
+            elif event.key == pygame.K_LEFT:
+                action = action & ~(MOVE_RIGHT | MOVE_STOP) | MOVE_LEFT
+            elif event.key == pygame.K_UP:
+                turning = ANGLE_UP
+            elif event.key == pygame.K_DOWN:
+                turning = ANGLE_DOWN
+            elif event.key == pygame.K_SPACE:
+                action |= SHOOT
+            elif event.key == pygame.K_F3 and profiler.enabled:
+                profiler.visible = not profiler.visible
+            elif event.key == pygame.K_ESCAPE:
+                print("The game has been closed.")
+                return(action, turning, True)
+            
+        # stops the movement of the player tank when right/left arrows are no longer pressed
+        if event.type == pygame.KEYUP: 
+            if event.key == pygame.K_LEFT or event.key == pygame.K_RIGHT:
+                action = action & ~(MOVE_LEFT | MOVE_RIGHT) | MOVE_STOP
+            if (event.key == pygame.K_UP and turning == ANGLE_UP) or (event.key == pygame.K_DOWN and turning == ANGLE_DOWN): 
+                turning = 0
+    return(action | turning, turning, False)
+
+def merge_actions(pending, action): 
     """
-    Calculates the moving speed of the tank based on the gradient of the ground.
-
-    Parameters:
-    - grad_tank (float): The gradient (slope) of the ground at the current position of the tank.
-
-    Returns:
-    - float: The moving speed of the tank.
-    """
-    if grad_tank > 8: 
-        speed = 0
-    elif grad_tank in [4, 5, 6, 7]: 
-        speed = 2
-    elif grad_tank in [2, 3]:
-        speed = 2.5
-    elif grad_tank in [-1, 0, 1]: 
-        speed = 3
-    elif -8 < grad_tank < -1: 
-        speed = 4
-    else:
-        speed = 5
-    return(speed)
-
-def load_images(player): 
-    """
-    Loads tank images for a given player.
+    Adds the action of a frame to the action waiting for the next tick (frames are drawn more often than ticks).
+    A new direction or turning replaces the waiting one, shooting is kept until the tick.
 
     Parameters:
-    - player (str): A string indicating the player / computer for whom tank images are to be loaded.
+    - pending (int): The waiting action.
+    - action (int): The action of the frame.
 
     Returns:
-    - list: A list of pygame.Surface objects representing the tank images.
+    - int: The new waiting action.
     """
-    j = 0
-    angles = [-40, -10, 0, 20, 50, 80]
-    images = ["" for _ in angles]
-    for k in angles:
-        # name of the imagine
-        name = "tanks_imgs/" + player + "_" + str(k) + "_deg.png"
-        images[j] = pygame.image.load(name)
-        j += 1
-    return(images)
+    for group in [MOVE_LEFT | MOVE_RIGHT | MOVE_STOP, ANGLE_UP | ANGLE_DOWN]: 
+        if action & group: 
+            pending &= ~group
+    return(pending | action)
 
-
-def draw_text(text, font, color, x, y, size=None):
+class simulation_thread: 
     """
-    Renders text on the screen.
-
-    Parameters:
-    - text (str): The text to be rendered.
-    - font (pygame.font.Font): The font object to render the text.
-    - color (tuple): The color of the text in RGB format.
-    - x (int): The x-coordinate of the text.
-    - y (int): The y-coordinate of the text.
-    - size (int, optional): The font size. If None, the font size of the provided font is used.
-
-    Returns:
-    - None
+    Simulates a match in a thread of its own at the fixed rate of the match, so the match keeps running while the 
+    main thread waits for the display (e.g. a slow display.flip). The thread holds the lock while it simulates
+    ticks, the main thread holds it while it draws the match.
+
+    Attributes:
+    - sim (simulation): The match.
+    - view (match_view): The view of the match (it remembers the positions of the tanks before every tick).
+    - record (recording): Record of the match, it gets the action of every tick.
+    - pacer (step_pacer): Decides when ticks are due.
+    - lock (threading.Lock): Protects the match, the waiting action and the events.
+    - pending (int): Action of the player waiting for the next tick.
+    - turning (int): ANGLE_UP / ANGLE_DOWN while the up / down arrow is held, 0 otherwise.
+    - events (list): Events of the ticks since the last call of take.
+    - steps (int): Number of ticks since the last call of take.
+    - running (bool): False once the thread should stop.
+    - thread (threading.Thread): The thread simulating the match.
+
+    Methods:
+    - __init__: Initializes a simulation_thread object.
+    - start: Starts the thread.
+    - run: Simulates the ticks that are due until the match is over.
+    - push: Passes the action of a frame to the thread.
+    - take: Returns the events of the ticks since the last call.
+    - stop: Stops the thread.
     """
-    if size:
-        font = pygame.font.Font(None, size)
-    text_surface = font.render(text, True, color)
-    text_rect = text_surface.get_rect()
-    text_rect.center = (x, y)
-    screen.blit(text_surface, text_rect)
 
+    def __init__(self, sim, view, record, pacer): 
+        self.sim = sim
+        self.view = view
+        self.record = record
+        self.pacer = pacer
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.turning = 0
+        self.events = []
+        self.steps = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self): 
+        self.pacer.reset()
+        self.thread.start()
+
+    def run(self): 
+        while self.running: 
+            with self.lock: 
+                for k in range(self.pacer.advance()): 
+                    self.view.remember()
+                    action = self.pending | self.turning
+                    self.pending = 0
+                    self.record.record(action)
+                    self.events.extend(self.sim.step({0: action}))
+                    self.steps += 1
+                    if self.sim.winner is not None: 
+                        self.running = False
+                        break
+                wait = self.pacer.time_step - self.pacer.accumulator
+            # sleep until the next tick is due
+            time.sleep(max(wait, 0.001))
+
+    def push(self, action, turning): 
+        with self.lock: 
+            self.pending = merge_actions(self.pending, action)
+            self.turning = turning
+
+    def take(self): 
+        # only called while the lock is held
+        events, steps = self.events, self.steps
+        self.events, self.steps = [], 0
+        return(events, steps)
+
+    def stop(self): 
+        self.running = False
+        if self.thread.is_alive(): 
+            self.thread.join()
 
 def artillery_game(planet):  
     """
     Main function to run the artillery game.
 
+    The match itself is simulated by a simulation object and drawn by a match_view object, this function 
+    only translates the keys pressed by the player into actions. The match advances by 25 ticks per second 
+    (see step_pacer) while frames are drawn as often as possible (at most max_fps per second), the tanks and 
+    missiles are drawn between their positions of the last two ticks.
+
     Parameters:
     - planet (int): An integer representing the chosen planet (1 for Earth, 2 for Moon, 3 for Mars, 4 for Ice Planet).
-    """
 
-    # settings depending on the chosen planet 
-    if planet == 1: 
-        # earth 
-        COL_GROUND = ( 76, 153, 0)
-        COL_SCORE = (0, 0, 0)
-        g = 9.81 
-        path_background_img = "backgrounds/background_earth.jpg"
-        ground_func = ground_earth
-        vel_norm = 95
-    elif planet == 2: 
-        # moon
-        COL_GROUND = (128, 128, 128)
-        COL_SCORE = (255, 255, 255)
-        g = 1.62
-        path_background_img = "backgrounds/background_moon.jpg"
-        ground_func = ground_moon
-        vel_norm = 40
-    elif planet == 3: 
-        # mars
-        COL_GROUND = (204, 102, 0)
-        COL_SCORE = (0,0,0)
-        g = 3.71
-        path_background_img = "backgrounds/background_mars.jpg"
-        ground_func = ground_mars
-        vel_norm = 60
-    else:
-        # ice planet 
-        COL_GROUND = (185, 242, 255)
-        COL_SCORE = (255,255,51)
-        g = 12 
-        path_background_img = "backgrounds/background_ice.jpg"
-        ground_func = ground_ice
-        vel_norm = 100
-
-    # radius of destruction from missiles 
-    destruction_radius = 12
-    
-    WEISS   = ( 255, 255, 255)
-    COL_MISSILES_ACTIVE = (255, 153,51)
-    COL_MISSILES_INACTIVE = (160, 160, 160)
-    EXPLOSION = (255, 153, 51)
-
-    # create matrix from given function that is used to draw the ground
-    ground = func_to_ground(ground_func)
+    Returns:
+    - tuple: The next scene (see run_scenes), the end screen once the match is over.
+    """
 
-    # create instance of tank for player tank
-    tank_player = tank(window_width, window_height, load_images("player"))
-    # create instance of tank for computer tank
-    tank_computer = tank( window_width, window_height, load_images("computer"))
-   
-    # collect tanks in list
-    tanks = [tank_player, tank_computer]
+    # create the match, the second tank is controlled by the computer
+    seed = random.randrange(2**32)
+    sim = simulation(planet, world_width, window_height, seed=seed, aiming=aiming, procedural=procedural, settling=settling)
+    view = match_view(sim, planet)
 
-    # Load the background image
-    background_image = pygame.image.load(path_background_img)
-    background_image_scalled = pygame.transform.scale(background_image, (window_width, window_height))
+    # the seed and the actions of the player are enough to replay the match
+    record = recording(planet, world_width, window_height, seed, procedural=procedural, settling=settling, aiming=aiming)
     
     # window update on 
     clock = pygame.time.Clock()
+    pacer = step_pacer(sim.clock.time_step)
+    runner = simulation_thread(sim, view, record, pacer) if threaded else None
+
+    # the profiler measures the phases of the simulation too (unless it runs in another thread)
+    sim.profiler = profiler if profiler.enabled and runner is None else None
 
-    # create instance of AI enemy
-    computer = AI_enemy(tank_computer)
+    # the cannon of the player tank turns as long as the up / down arrow is pressed, 
+    # the other actions wait for the next tick
+    turning = 0
+    pending = 0
+
+    profiler.start()
+    if runner is not None: 
+        runner.start()
 
     # main loop 
     while True:
         # check if user has clicked on keys to perform some action 
-        for event in pygame.event.get():
-            # quiting game
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-
-                # keys for player
-                if event.key == pygame.K_RIGHT:
-                    tank_player.move_direction = 1
-                elif event.key == pygame.K_LEFT:
-                    tank_player.move_direction = - 1
-                elif event.key == pygame.K_UP:
-                    tank_player.angle_adjust("pos")
-                elif event.key == pygame.K_DOWN:
-                    tank_player.angle_adjust("neg")
-                elif event.key == pygame.K_SPACE:
-                    tank_player.shoot(vel_norm)
-                elif event.key == pygame.K_ESCAPE:
-                    print("The game has been closed.")
-                    pygame.quit()
-                    sys.exit()
-                
-            # stops the movement of the player tank when right/left arrows are no longer pressed
-            if event.type == pygame.KEYUP: 
-                if event.key == pygame.K_LEFT or event.key == pygame.K_RIGHT:
-                    tank_player.move_direction = 0
-
-        # AI decisions
-        computer.decision_running(tank_computer)
-        computer.decision_shooting(tank_computer, vel_norm)
-        computer.decision_reloading(tank_computer)
-        computer.decision_movement( tank_computer)
-
-        # fill screen white
-        screen.fill(WEISS) 
-
-        # blit the background image onto the screen
-        screen.blit(background_image_scalled, (0, 0))
-
-        # drawing the ground
-        draw_ground(ground, COL_GROUND)
-
-        # show score
-        score = str(tanks[0].points) + " : " + str(tanks[1].points)
-        draw_text(score, font, COL_SCORE, window_width // 2, 40, size = 55)
- 
-        for panzer in tanks: 
-            # if the tank is in the air its y-coordinate is changed in every iteration such that the tank falls to the ground
-            panzer.falling(ground)
-
-            # reload ammunition 
-            panzer.reloading()
-            
-            # if tank is moving: 
-            if not panzer.move_direction == 0:
-                
-                # gradient of current position of tank
-                grad = gradient(panzer.position, panzer.move_direction, ground) 
-                # new x-coordinate of tank 1
-                panzer.position[0] += moving_speed(grad) * panzer.move_direction 
-                panzer.position[0] = min(panzer.position[0], window_width - 20)
-                # coresponding new column of tank 1 
-                column_tank = int(panzer.position[0])
-                # coresponding new row of tank 1
-                row_tank = np.nonzero(ground[:, column_tank])[0][0]
-
-                # new height of the tank:     
-                # if there is ground beneath the tank the height changes by falling (see falling function)
-                # and not by moving
-                if ground[panzer.position[1] + 10, panzer.position[0]] == 1:
-                    panzer.position[1] = row_tank 
-
-            # hitbox of tank 
-            panzer.hitbox = [[panzer.position[0] - 18 + panzer.counter * 10, panzer.position[1] - 20], 35, 25]
-            
-            # show imagine of tank
-            screen.blit(panzer.imgs[panzer.frame - 1], (panzer.position[0] - 20, panzer.position[1] - 50))
-            
-            # setting up colors of available / unavailable missiles
-            col_missiles = [COL_MISSILES_ACTIVE for _ in range(3)]
+        action, turning, quit = player_input(turning)
+        if quit: 
+            if runner is not None: 
+                runner.stop()
+            save_recording(record)
+            pygame.quit()
+            sys.exit()
+        profiler.mark("events")
+
+        if runner is None: 
+            # advance the match by the ticks that are due
+            pending = merge_actions(pending, action)
+            events = []
+            steps = pacer.advance()
+            for k in range(steps): 
+                view.remember()
+                record.record(pending | turning)
+                events += sim.step({0: pending | turning})
+                pending = 0
+                if sim.winner is not None: 
+                    break
+            profiler.mark("missiles")
+            view.draw(events, steps, pacer.alpha())
+        else: 
+            runner.push(action, turning)
+            with runner.lock: 
+                events, steps = runner.take()
+                view.draw(events, steps, pacer.alpha())
+
+        if sim.winner is not None: 
+            # go to end screen when one tank reached 3 points (the match is released once this function returns)
+            if runner is not None: 
+                runner.stop()
+            save_recording(record)
+            return(("end", sim.score(), sim.winner, planet))
+
+        if profiler.visible: 
+            view.rects.append(draw_profiler_overlay(profiler))
+        profiler.mark("overlay")
+
+        # update the parts of the display that changed
+        view.present()
+        profiler.mark("flip")
 
-            if panzer.num_missiles == 0: 
-                col_missiles[0:3] = [COL_MISSILES_INACTIVE] * 3
-            elif panzer.num_missiles == 1: 
-                col_missiles[0:2] = [COL_MISSILES_INACTIVE] * 2 
-            elif panzer.num_missiles == 2:
-                col_missiles[0:1] = [COL_MISSILES_INACTIVE] * 1
+        # regulating frame rate
+        clock.tick(max_fps)
+        profiler.mark("wait")
+        profiler.next_frame()
     
-            # drawing of the 3 available / unavailable missiles 
-            for k in range(3): 
-                pygame.draw.ellipse(screen, col_missiles[k], [10 + panzer.counter * 875 , 50 + k * 40,35,25]) # inner ellipse
-                pygame.draw.ellipse(screen, (204,102,0), [10 + panzer.counter * 875, 50 + k * 40,35,25], 2)  # outer ellipse 
+def network_game(peer): 
+    """
+    Runs a network match against another player (see net.py). Both players simulate the match, 
+    only their actions are exchanged.
 
-            # life bar - constists of a grey and a red bar
-            # grey bar
-            pygame.draw.rect(screen, (192, 192, 192), [10 + panzer.counter * 810, 10, 100, 25])
-            # red bar
-            pygame.draw.rect(screen, (210,0,0), [10 + panzer.counter * (810 + 100 - panzer.life), 10, panzer.life, 25])
-
-            # update positions of every missile that is in the air 
-            for miss in panzer.missiles: 
-                miss.position_update(g, ground)
-                # draw missile
-                pygame.draw.circle(screen, ( 255, 0, 0), miss.position, 10, 10)
-                
-                # collision control if missile hits enemy tank
-                if collision(tanks[-panzer.counter + 1].hitbox, [[miss.position[0] - 10, miss.position[1] - 10], 20, 20]):
-                    tanks[-panzer.counter + 1].life -= 50
-
-                    # save distance of last missile to computer tank for ai decision making
-                    computer.distance = 0
-                        
-                    # draw explosion
-                    pygame.draw.circle(screen, EXPLOSION, miss.position + [4, - 4], 20, 10)
-                    # remove current missile from list
-                    panzer.missiles.remove(miss)
-
-                    # if one of the tanks has no life left
-                    if tanks[-panzer.counter + 1].life == 0: 
-                        # update score of other tank
-                        panzer.points += 1
-                        if panzer.points == 3: 
-                            # go to end screen when one tank reacher 3 points
-                            score = str(tanks[0].points) + " : " + str(tanks[1].points)
-                            winner = panzer
-                            end_screen(score, winner, planet) 
-                        else:  
-                            time.sleep(0.2)
-                            # set life of destroyed tank to 100
-                            tanks[-panzer.counter + 1].life = 100
-                            for tnk in tanks: 
-                                # respawn tanks
-                                tnk.position = np.array([50 + tnk.counter * 830, 150])
-                                # delete all current missiles that are in the air
-                                tnk.missiles = []
-                                # instant reloading of missiles
-                                tnk.num_missiles = 3
-
-                            
-                # updates ground if hit by missile
-                elif update_ground(miss, ground, destruction_radius): 
-                    # draw explosion
-                    pygame.draw.circle(screen, EXPLOSION, miss.position, 20, 10)
-
-                    # update distance of player missile to computer tank (for AI decision making)
-                    if panzer.counter == 0: 
-                        computer.distance = abs(miss.position[0] - tanks[1].position[0] )
-    
-                    # remove current missile from list
-                    panzer.missiles.remove(miss)
+    Parameters:
+    - peer (lockstep_peer): Connection to the other player.
 
-        # update display
-        pygame.display.flip()
+    Returns:
+    - tuple: The next scene (see run_scenes), the end screen once the match is over.
+    """
+    sim = peer.simulation(window_height)
+    view = match_view(sim, peer.planet, peer.local_tank)
+    clock = pygame.time.Clock()
+    turning = 0
 
-        # regulating frame rate
+    while True:
+        action, turning, quit = player_input(turning)
+        if quit: 
+            peer.close()
+            pygame.quit()
+            sys.exit()
+
+        try:
+            events = peer.step(sim, action)
+        except ConnectionError as error:
+            print(error)
+            peer.close()
+            pygame.quit()
+            sys.exit()
+
+        if sim.winner is not None: 
+            # the other player finds the winner at the same tick (it may still be a few ticks behind)
+            peer.finish()
+            return(("end", sim.score(), sim.winner, peer.planet))
+
+        view.draw(events)
+        if peer.desyncs: 
+            view.rects.append(draw_text("desync at tick " + str(peer.desyncs[-1]), font, view.col_score, window_width // 2, 
+                                        window_height - 30, size = 30))
+        view.present()
         clock.tick(25)
-    
-# initialisation of pygame
-pygame.init()
 
-# seting up screen 
-screen = pygame.display.set_mode((window_width, window_height))
+def wait_screen(text): 
+    # shown while the game waits for the other player (the window does not react meanwhile)
+    screen.fill(BLACK)
+    draw_text(text, font, WHITE, window_width // 2, window_height // 2)
+    pygame.display.flip()
 
-# title for screen
-pygame.display.set_caption("Interplanetary Artillery game")
+def replay_game(path): 
+    """
+    Shows a recorded match. Space pauses, the left / right arrows jump 10 seconds back / forward, 
+    escape closes the window.
 
-# fonts
-font = pygame.font.Font(None, 36)
+    Parameters:
+    - path (str): Path of the replay file.
+    """
+    record = recording.load(path)
+    player = replay_player(record)
+    view = match_view(player.sim, record.planet)
+    clock = pygame.time.Clock()
+    jump = round(10 / player.sim.clock.time_step)
+    paused = False
 
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.KEYDOWN: 
+                if event.key == pygame.K_SPACE: 
+                    paused = not paused
+                elif event.key == pygame.K_LEFT: 
+                    player.seek(player.tick - jump)
+                    view.particles.clear()
+                elif event.key == pygame.K_RIGHT: 
+                    player.seek(player.tick + jump)
+                    view.particles.clear()
+
+        events = [] if paused else player.step()
+        view.draw(events)
+
+        # time of the replay
+        time_step = player.sim.clock.time_step
+        current, total = int(player.tick * time_step), int(len(record.actions) * time_step)
+        view.rects.append(draw_text(f"{current // 60}:{current % 60:02d} / {total // 60}:{total % 60:02d}" + (" (paused)" if paused else ""), 
+                                    font, view.col_score, window_width // 2, window_height - 30, size = 30))
+
+        view.present()
+        clock.tick(25)
+    
 # colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -567,9 +841,6 @@ MOON = (192, 192, 192)
 MARS = (193,68,14)
 ICE = (185, 242, 255)
 
-# size of the blocks
-block_size = 1
-
 def start_screen(): 
     """
     Displays the start screen of the game where the player can choose the planet.
@@ -578,15 +849,14 @@ def start_screen():
     - None
 
     Returns:
-    - None
+    - tuple: The next scene (see run_scenes), a match on the chosen planet.
     """
     
     # initialise planet variable by 1 
     planet = 1 
 
     # Load the background image
-    background_image = pygame.image.load("backgrounds/star_background.jpg")
-    background_image_scalled = pygame.transform.scale(background_image, (window_width, window_height))
+    background_image_scalled = load_background("backgrounds/star_background.jpg")
 
     # main loop for start screen
     while True: 
@@ -620,7 +890,7 @@ def start_screen():
                         planet -= 1
                 if event.key == pygame.K_RETURN:
                     # Start the game here
-                    artillery_game(planet)
+                    return(("game", planet))
                 elif event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
@@ -644,7 +914,7 @@ def end_screen(score, winner, planet):
     - planet (int): The (previously) chosen planet.
 
     Returns:
-    - None
+    - tuple: The next scene (see run_scenes), another match or the start screen.
     """
 
     if winner.counter == 0: 
@@ -681,13 +951,9 @@ def end_screen(score, winner, planet):
                         option -= 1
                 if event.key == pygame.K_RETURN:
                     if option == 1: 
-                        # reset counter of the tank class
-                        tank.counter = -1
-                        artillery_game(planet)
+                        return(("game", planet))
                     elif option == 2:
-                        # reset counter of the tank class
-                        tank.counter = -1
-                        start_screen()
+                        return(("start",))
                     else: 
                         pygame.quit()
                         sys.exit()
@@ -703,4 +969,90 @@ def end_screen(score, winner, planet):
        # update display
         pygame.display.flip()
 
-start_screen()
\ No newline at end of file
+# functions showing the scenes of the game, every function returns the next scene (see run_scenes)
+SCENES = {"start": start_screen, "game": artillery_game, "network": network_game, "end": end_screen}
+
+def run_scenes(scene): 
+    """
+    Shows the scenes of the game one after the other. A scene is a tuple of the name of the scene in SCENES and 
+    the arguments of its function. Scenes return the next scene instead of calling it, so a scene and everything 
+    it created (e.g. the match and its surfaces) is released before the next one starts, however many rounds 
+    are played. The scenes end the game themselves when the player closes the window.
+
+    Parameters:
+    - scene (tuple): The first scene.
+    """
+    while True: 
+        name, *arguments = scene
+        scene = SCENES[name](*arguments)
+
+def main(argv=None): 
+    """
+    Initialises pygame, opens the window and shows the start screen.
+
+    Parameters:
+    - argv (list, optional): Command line arguments (sys.argv is used if None).
+    """
+    global screen, font, profiler, world_width, procedural, settling, aiming, max_fps, threaded
+
+    parser = argparse.ArgumentParser(description="Interplanetary Artillery Game")
+    parser.add_argument("--profile", action="store_true", help="measure the phases of every frame (F3 shows the statistics)")
+    parser.add_argument("--profile-csv", metavar="PATH", help="write the measured phases of every frame to a CSV file (implies --profile)")
+    parser.add_argument("--replay", metavar="PATH", help="show a recorded match (see the replays directory)")
+    parser.add_argument("--host", metavar="PORT", type=int, help="wait for another player and play a network match")
+    parser.add_argument("--join", metavar="ADDRESS:PORT", help="join the network match of another player")
+    parser.add_argument("--planet", type=int, default=1, choices=[1, 2, 3, 4], help="planet of a hosted network match")
+    parser.add_argument("--world-width", type=int, default=window_width, help="width of the world in pixels (wider worlds scroll)")
+    parser.add_argument("--procedural", action="store_true", help="generate a new ground from noise for every match")
+    parser.add_argument("--settling", action="store_true", help="loose ground above craters falls down")
+    parser.add_argument("--aiming", action="store_true", help="the computer aims at the player instead of shooting at random")
+    parser.add_argument("--max-fps", type=int, default=max_fps, help="frames drawn per second at most (0: no limit and no vsync)")
+    parser.add_argument("--sim-thread", action="store_true", help="simulate the match in a thread of its own")
+    args = parser.parse_args(argv)
+    if args.world_width >= 2**32:
+        # the width of replays and network matches and the columns of the craters sent over the network take 32 bits
+        parser.error("--world-width must be less than 2**32")
+    world_width = max(args.world_width, window_width)
+    procedural = args.procedural
+    settling = args.settling
+    aiming = args.aiming
+    max_fps = args.max_fps
+    threaded = args.sim_thread
+    if args.profile or args.profile_csv: 
+        profiler = frame_profiler(PHASES, csv_path=args.profile_csv)
+        atexit.register(profiler.close)
+
+    # initialisation of pygame
+    pygame.init()
+
+    # seting up screen, with vsync frames are only drawn when the display shows them (vsync needs the SCALED flag 
+    # and is not available with every video driver)
+    screen = None
+    if max_fps: 
+        try: 
+            screen = pygame.display.set_mode((window_width, window_height), pygame.SCALED, vsync=1)
+        except pygame.error: 
+            pass
+    if screen is None: 
+        screen = pygame.display.set_mode((window_width, window_height))
+
+    # title for screen
+    pygame.display.set_caption("Interplanetary Artillery game")
+
+    # fonts
+    font = pygame.font.Font(None, 36)
+
+    if args.replay: 
+        replay_game(args.replay)
+    scene = ("start",)
+    if args.host: 
+        wait_screen("Waiting for the other player on port " + str(args.host))
+        scene = ("network", lockstep_peer.host_match(args.host, args.planet, world_width, procedural, settling))
+    if args.join: 
+        address, port = args.join.rsplit(":", 1)
+        wait_screen("Connecting to " + args.join)
+        scene = ("network", lockstep_peer.join_match(address, int(port)))
+    run_scenes(scene)
+
+if __name__ == "__main__": 
+    main()
@@ -0,0 +1,337 @@
+import argparse
+import random
+import select
+import socket
+import struct
+import sys
+import time
+import zlib
+import numpy as np
+from simulation import simulation, MOVE_LEFT, MOVE_RIGHT, MOVE_STOP, ANGLE_UP, ANGLE_DOWN, SHOOT
+
+# handshake sent by the host: magic, version, planet, generated ground (0 / 1), settling ground (0 / 1), width of the
+# world, seed, input delay, ticks between two state hashes
+HANDSHAKE = struct.Struct("<4sBBBBIQBH")
+MAGIC = b"ARTN"
+VERSION = 7
+
+# messages: an input is a single byte (the action flags use the lower 6 bits), the other messages start with a
+# type byte that has one of the upper 2 bits set
+HASH = 0x40     # tick (uint32), hash of the state after the tick (uint32)
+CRATERS = 0x80  # tick (uint32), number of craters (uint8), x (uint32), y (int16) and radius (uint8) of every crater
+HASH_MESSAGE = struct.Struct("<BII")
+CRATER_HEADER = struct.Struct("<BIB")
+CRATER = struct.Struct("<IhB")
+
+def state_hash(sim):
+    """
+    Returns a checksum of the state of a match (ground, tanks and missiles).
+
+    Parameters:
+    - sim (simulation): The match.
+
+    Returns:
+    - int: CRC32 checksum.
+    """
+    # the chunks without craters are the same for both players
+    crc = 0
+    for k in sorted(sim.ground.modified): 
+        crc = zlib.crc32(sim.ground.chunks[k].bits.tobytes(), zlib.crc32(k.to_bytes(4, "little"), crc))
+    for panzer in sim.tanks:
+        crc = zlib.crc32(np.array([*panzer.position, panzer.life, panzer.points, panzer.frame, panzer.num_missiles],
+                                  dtype=np.int64).tobytes(), crc)
+    crc = zlib.crc32(sim.missiles.position[:sim.missiles.count].astype(np.int64).tobytes(), crc)
+    return(crc)
+
+class lockstep_peer:
+    """
+    Represents one of the two players of a network match.
+
+    Both players simulate the whole match. Only the actions of the players are sent: the action of a tick is
+    sent delay ticks in advance and a tick is only simulated when the actions of both players have arrived
+    (lockstep). Every hash_interval ticks both players send a checksum of their state to detect desyncs.
+    The host also sends the craters of every tick as (x, y, radius), the client carves craters it is missing,
+    so the ground of both players stays the same without sending it.
+
+    Attributes:
+    - sock (socket.socket): Connection to the other player.
+    - host (bool): True for the player that opened the match (tank 0), False for the other one (tank 1).
+    - planet (int): The chosen planet.
+    - width (int): Width of the world in pixels.
+    - procedural (bool): If True the ground is generated from noise.
+    - settling (bool): If True loose ground above craters falls down.
+    - seed (int): Seed of the match.
+    - delay (int): Number of ticks between an input and its execution.
+    - hash_interval (int): Number of ticks between two state hashes.
+    - local_tank (int): Number of the tank of this player.
+    - remote_tank (int): Number of the tank of the other player.
+    - tick (int): Number of ticks simulated.
+    - local_actions (list): Actions of this player for every tick.
+    - remote_actions (list): Actions of the other player for every tick (as far as received).
+    - local_hashes (dict): Hashes of the own state keyed by the tick.
+    - remote_hashes (dict): Hashes received from the other player keyed by the tick.
+    - remote_craters (dict): Craters received from the host keyed by the tick.
+    - local_craters (dict): Own craters of the ticks whose craters from the host have not arrived yet.
+    - desyncs (list): Ticks at which the hashes of both players differed.
+    - repairs (int): Number of craters carved because the client was missing them.
+    - buffer (bytearray): Received bytes that do not form a complete message yet.
+    - bytes_sent (int): Number of bytes sent (without the handshake).
+    - bytes_received (int): Number of bytes received (without the handshake).
+    - connected (bool): False once the other player closed the connection.
+
+    Methods:
+    - __init__: Initializes a lockstep_peer object.
+    - host_match: Waits for the other player and starts a match.
+    - join_match: Connects to a host.
+    - simulation: Creates the simulation of the match.
+    - send: Sends a message.
+    - poll: Receives all messages that have arrived.
+    - step: Simulates the next tick with the actions of both players.
+    - check: Compares the hashes and repairs missing craters.
+    - finish: Closes the connection once the other player has received everything.
+    - close: Closes the connection at once.
+    """
+
+    def __init__(self, sock, host, planet, width, procedural, settling, seed, delay=3, hash_interval=25):
+        self.sock = sock
+        self.host = host
+        self.planet = planet
+        self.width = width
+        self.procedural = procedural
+        self.settling = settling
+        self.seed = seed
+        self.delay = delay
+        self.hash_interval = hash_interval
+        self.local_tank = 0 if host else 1
+        self.remote_tank = 1 - self.local_tank
+        self.tick = 0
+        # nobody acts during the first ticks
+        self.local_actions = [0] * delay
+        self.remote_actions = [0] * delay
+        self.local_hashes = {}
+        self.remote_hashes = {}
+        self.remote_craters = {}
+        self.local_craters = {}
+        self.desyncs = []
+        self.repairs = 0
+        self.buffer = bytearray()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.connected = True
+
+    @classmethod
+    def host_match(cls, port, planet, width=930, procedural=False, settling=False, seed=None, delay=3, hash_interval=25):
+        seed = random.randrange(2**32) if seed is None else seed
+        with socket.create_server(("", port)) as server:
+            sock, address = server.accept()
+        # the messages are tiny, they are sent at once instead of being collected
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(HANDSHAKE.pack(MAGIC, VERSION, planet, procedural, settling, width, seed, delay, hash_interval))
+        return(cls(sock, True, planet, width, procedural, settling, seed, delay, hash_interval))
+
+    @classmethod
+    def join_match(cls, address, port, timeout=10):
+        # the host may not be waiting yet, try again until the timeout is over
+        deadline = time.time() + timeout
+        while True:
+            try:
+                sock = socket.create_connection((address, port), timeout)
+                break
+            except ConnectionRefusedError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.2)
+        data = b""
+        while len(data) < HANDSHAKE.size:
+            chunk = sock.recv(HANDSHAKE.size - len(data))
+            if not chunk:
+                raise ConnectionError("the host closed the connection")
+            data += chunk
+        magic, version, planet, procedural, settling, width, seed, delay, hash_interval = HANDSHAKE.unpack(data)
+        if magic != MAGIC or version != VERSION:
+            raise ConnectionError("the host runs another version of the game")
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return(cls(sock, False, planet, width, bool(procedural), bool(settling), seed, delay, hash_interval))
+
+    def simulation(self, height=720):
+        # both tanks are controlled by players, the host chose the width of the world and the kind of ground
+        return(simulation(self.planet, self.width, height, computer_tanks=(), seed=self.seed, procedural=self.procedural, 
+                          settling=self.settling))
+
+    def send(self, data):
+        try:
+            self.sock.sendall(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # the other player is gone (poll notices it), the ticks whose actions have arrived can still be simulated
+            return
+        self.bytes_sent += len(data)
+
+    def poll(self, timeout=0):
+        """
+        Receives and decodes all messages that have arrived.
+
+        Parameters:
+        - timeout (float, optional): Maximal time in seconds to wait for data (None waits until data arrives).
+        """
+        while self.connected and select.select([self.sock], [], [], timeout)[0]:
+            try:
+                data = self.sock.recv(4096)
+            except ConnectionResetError:
+                data = b""
+            if not data:
+                self.connected = False
+                break
+            self.bytes_received += len(data)
+            self.buffer += data
+            timeout = 0
+
+        # decode the complete messages
+        buffer = self.buffer
+        k = 0
+        while k < len(buffer):
+            kind = buffer[k]
+            if kind & HASH:
+                if len(buffer) - k < HASH_MESSAGE.size:
+                    break
+                _, tick, crc = HASH_MESSAGE.unpack_from(buffer, k)
+                self.remote_hashes[tick] = crc
+                k += HASH_MESSAGE.size
+            elif kind & CRATERS:
+                if len(buffer) - k < CRATER_HEADER.size:
+                    break
+                _, tick, count = CRATER_HEADER.unpack_from(buffer, k)
+                size = CRATER_HEADER.size + count * CRATER.size
+                if len(buffer) - k < size:
+                    break
+                self.remote_craters[tick] = [CRATER.unpack_from(buffer, k + CRATER_HEADER.size + j * CRATER.size) for j in range(count)]
+                k += size
+            else:
+                self.remote_actions.append(kind)
+                k += 1
+        del buffer[:k]
+
+    def step(self, sim, action):
+        """
+        Sends the action of this player and simulates the next tick once the action of the other player has arrived.
+
+        Parameters:
+        - sim (simulation): The match (created by the simulation method).
+        - action (int): Action of this player (executed delay ticks later).
+
+        Returns:
+        - list: Events of the tick as returned by simulation.step.
+        """
+        self.local_actions.append(action)
+        self.send(bytes([action]))
+
+        # wait for the other player (lockstep)
+        while len(self.remote_actions) <= self.tick:
+            if not self.connected:
+                raise ConnectionError("the other player left the match")
+            self.poll(timeout=None)
+        events = sim.step({self.local_tank: self.local_actions[self.tick], self.remote_tank: self.remote_actions[self.tick]})
+        tick = self.tick
+        self.tick += 1
+
+        craters = [(int(x), int(y), sim.destruction_radius) for kind, (x, y) in events
+                   if kind == "crater" and 0 <= x < sim.width and 0 <= y < sim.height]
+        if self.host and craters:
+            self.send(CRATER_HEADER.pack(CRATERS, tick, len(craters)) + b"".join(CRATER.pack(*crater) for crater in craters))
+        elif not self.host:
+            self.local_craters[tick] = craters
+        if self.tick % self.hash_interval == 0:
+            self.local_hashes[self.tick] = state_hash(sim)
+            self.send(HASH_MESSAGE.pack(HASH, self.tick, self.local_hashes[self.tick]))
+
+        self.poll()
+        self.check(sim)
+        return(events)
+
+    def check(self, sim):
+        # compare the hashes of both players
+        for tick in [tick for tick in self.remote_hashes if tick in self.local_hashes]:
+            if self.remote_hashes.pop(tick) != self.local_hashes.pop(tick):
+                self.desyncs.append(tick)
+                print(f"desync at tick {tick}", file=sys.stderr)
+
+        # carve the craters of the host that are missing (the host sends the action of its next step after the 
+        # craters of a tick, so the craters of all ticks before the last received step are complete)
+        received = len(self.remote_actions) - self.delay - 2
+        for tick in [tick for tick in self.local_craters if tick <= received]:
+            own = self.local_craters.pop(tick)
+            for x, y, radius in self.remote_craters.pop(tick, []):
+                if (x, y, radius) not in own:
+                    sim.ground.carve(y, x, radius)
+                    self.repairs += 1
+
+    def finish(self, timeout=5):
+        """
+        Ends the match in order: this player stops sending and the connection is only closed when the other player
+        has stopped sending too. The other player may be a few ticks behind, closing at once would discard the
+        actions it has not read yet (and it would find the other player gone before it reached the end).
+
+        Parameters:
+        - timeout (float, optional): Maximal time in seconds to wait for the other player.
+        """
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        # the remaining messages are still decoded (e.g. the last hashes)
+        deadline = time.time() + timeout
+        while self.connected and time.time() < deadline:
+            self.poll(timeout=deadline - time.time())
+        self.sock.close()
+
+    def close(self):
+        self.sock.close()
+
+# actions of the scripted players of the headless test
+SCRIPTED_ACTIONS = [0, 0, 0, MOVE_LEFT, MOVE_RIGHT, MOVE_STOP, ANGLE_UP, ANGLE_DOWN, SHOOT]
+
+def main(argv=None):
+    """
+    Plays a network match without display between two scripted players (random actions), e.g. in two processes:
+    python net.py host --port 5555 and python net.py join --address localhost --port 5555.
+
+    Parameters:
+    - argv (list, optional): Command line arguments (sys.argv is used if None).
+    """
+    parser = argparse.ArgumentParser(description="Play a network match of the artillery game without display.")
+    parser.add_argument("role", choices=["host", "join"])
+    parser.add_argument("--address", default="localhost", help="address of the host (join only)")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--planet", type=int, default=1, choices=[1, 2, 3, 4])
+    parser.add_argument("--width", type=int, default=930, help="width of the world in pixels (host only)")
+    parser.add_argument("--procedural", action="store_true", help="generate the ground from noise (host only)")
+    parser.add_argument("--settling", action="store_true", help="loose ground above craters falls down (host only)")
+    parser.add_argument("--ticks", type=int, default=25 * 60)
+    parser.add_argument("--realtime", action="store_true", help="simulate 25 ticks per second instead of as fast as possible")
+    args = parser.parse_args(argv)
+
+    if args.role == "host":
+        peer = lockstep_peer.host_match(args.port, args.planet, args.width, args.procedural, args.settling)
+    else:
+        peer = lockstep_peer.join_match(args.address, args.port)
+    sim = peer.simulation()
+    rng = random.Random(peer.local_tank)
+
+    start = time.time()
+    for k in range(args.ticks):
+        peer.step(sim, rng.choice(SCRIPTED_ACTIONS))
+        # both players find the winner at the same tick
+        if sim.winner is not None:
+            break
+        if args.realtime:
+            time.sleep(max(0, start + (k + 1) / 25 - time.time()))
+    # let the last hashes arrive
+    peer.finish()
+    peer.check(sim)
+
+    seconds = peer.tick * sim.clock.time_step
+    print(f"{args.role}: {peer.tick} ticks, score {sim.score()}, hash {state_hash(sim):08x}, desyncs {len(peer.desyncs)}, "
+          f"repaired craters {peer.repairs}, sent {peer.bytes_sent / seconds:.0f} B/s, received {peer.bytes_received / seconds:.0f} B/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import numpy as np
+import pygame
+
+# kinds of particles
+SMOKE = 0
+DIRT = 1
+DEBRIS = 2
+
+# behavior of every kind: gravity in pixels per frame², part of the velocity kept per frame, largest speed in pixels
+# per frame and lifetime in frames (every particle lives between half and all of it)
+PARTICLE_SETTINGS = {
+    SMOKE: {"gravity": -0.05, "drag": 0.92, "speed": 2.5, "lifetime": 50},
+    DIRT: {"gravity": 0.45, "drag": 0.98, "speed": 9.0, "lifetime": 30},
+    DEBRIS: {"gravity": 0.35, "drag": 0.97, "speed": 12.0, "lifetime": 40},
+}
+# number of colors a particle goes through from its birth to its death
+SHADES = 16
+
+class particle_pool:
+    """
+    Represents the particles of the explosions (smoke, dirt and debris), stored in arrays of a fixed capacity.
+
+    All arrays (including the ones holding intermediate results) are allocated once, so emitting, updating and
+    drawing particles creates no objects per particle. The slots are used as a ring: when the pool is full the
+    oldest particles are replaced. Dead particles stay in their slots until they are replaced, every update and
+    draw handles all slots used so far, so the cost of a frame only depends on the capacity.
+    The particles are only drawn, they do not change the match (their random numbers are not the ones of the match).
+
+    Attributes:
+    - capacity (int): Largest number of particles.
+    - used (int): Number of slots used so far (only the first used entries of the arrays are handled).
+    - cursor (int): Slot of the next particle.
+    - position (numpy.ndarray): Positions of the particles in pixels of the world.
+    - velocity (numpy.ndarray): Velocities of the particles in pixels per frame.
+    - gravity (numpy.ndarray): Vertical acceleration of every particle.
+    - drag (numpy.ndarray): Part of the velocity every particle keeps per frame.
+    - life (numpy.ndarray): Remaining frames of every particle (dead if not positive).
+    - lifetime (numpy.ndarray): Frames every particle lives in total.
+    - first_shade (numpy.ndarray): Index of the first color of every particle in the palette.
+    - palette (numpy.ndarray): SHADES colors (RGB) of every kind, from the color at birth to the color at death.
+    - mapped (numpy.ndarray): The palette as pixel values of the surface drawn on (None before the first draw).
+    - rng (numpy.random.Generator): Random number generator of the particles.
+
+    Methods:
+    - __init__: Initializes a particle_pool object.
+    - emit: Throws particles from a point.
+    - update: Moves all particles.
+    - draw: Draws all living particles.
+    - clear: Removes all particles.
+    """
+
+    def __init__(self, colors, capacity=32768, seed=None):
+        self.capacity = capacity
+        self.used = 0
+        self.cursor = 0
+        self.position = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.gravity = np.zeros(capacity, dtype=np.float32)
+        self.drag = np.ones(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.lifetime = np.ones(capacity, dtype=np.float32)
+        self.first_shade = np.zeros(capacity, dtype=np.intp)
+        self.rng = np.random.default_rng(seed)
+
+        # colors of every kind fading from the first to the second color of colors
+        fade = np.linspace(0, 1, SHADES)[:, None]
+        self.palette = np.array([(1 - fade) * colors[kind][0] + fade * colors[kind][1] for kind in sorted(PARTICLE_SETTINGS)],
+                                dtype=np.uint8)
+        self.mapped = None
+
+        # intermediate results
+        self.random = np.zeros((capacity, 2), dtype=np.float32)
+        self.scratch = np.zeros(capacity, dtype=np.float32)
+        self.column = np.zeros(capacity, dtype=np.intp)
+        self.row = np.zeros(capacity, dtype=np.intp)
+        self.shade = np.zeros(capacity, dtype=np.intp)
+        self.visible = np.zeros(capacity, dtype=bool)
+        self.inside = np.zeros(capacity, dtype=bool)
+        self.pixel = np.zeros(capacity, dtype=np.uint32)
+        self.corner = np.zeros((2, 2), dtype=np.uint32)
+
+    def emit(self, kind, x, y, count, spread=np.pi):
+        """
+        Throws particles from a point, upwards within an angle.
+
+        Parameters:
+        - kind (int): SMOKE, DIRT or DEBRIS.
+        - x (float): Column of the point in the world.
+        - y (float): Row of the point.
+        - count (int): Number of particles.
+        - spread (float, optional): Angle (in radians) around the upward direction the particles are thrown into.
+        """
+        settings = PARTICLE_SETTINGS[kind]
+        count = min(count, self.capacity)
+        start = self.cursor
+        # the slots at the end of the arrays and, if they are not enough, the slots at the beginning
+        for a, b in [(start, min(start + count, self.capacity)), (0, start + count - self.capacity)]:
+            if a >= b:
+                continue
+            random = self.random[a:b]
+            self.rng.random(dtype=np.float32, out=random)
+            angle = self.scratch[a:b]
+            np.subtract(random[:, 0], 0.5, out=angle)
+            angle *= spread
+            angle -= np.pi / 2
+            speed = random[:, 1]
+            speed *= 0.8 * settings["speed"]
+            speed += 0.2 * settings["speed"]
+            np.cos(angle, out=self.velocity[a:b, 0])
+            self.velocity[a:b, 0] *= speed
+            np.sin(angle, out=self.velocity[a:b, 1])
+            self.velocity[a:b, 1] *= speed
+            self.position[a:b, 0] = x
+            self.position[a:b, 1] = y
+            self.gravity[a:b] = settings["gravity"]
+            self.drag[a:b] = settings["drag"]
+            # the lifetime is chosen from the first random number again (it was only used for the angle)
+            np.multiply(random[:, 0], 0.5 * settings["lifetime"], out=self.lifetime[a:b])
+            self.lifetime[a:b] += 0.5 * settings["lifetime"]
+            self.life[a:b] = self.lifetime[a:b]
+            self.first_shade[a:b] = kind * SHADES
+        self.cursor = (start + count) % self.capacity
+        self.used = min(self.used + count, self.capacity)
+
+    def update(self, ticks=1.0):
+        # ticks: time since the last update in ticks of the match (a fraction if frames are drawn more often)
+        n = self.used
+        velocity = self.velocity[:n]
+        if ticks == 1:
+            # one frame per tick (the power of the drag is slow)
+            velocity[:, 1] += self.gravity[:n]
+            velocity *= self.drag[:n, None]
+            self.position[:n] += velocity
+        else:
+            np.multiply(self.gravity[:n], ticks, out=self.scratch[:n])
+            velocity[:, 1] += self.scratch[:n]
+            np.power(self.drag[:n], ticks, out=self.scratch[:n])
+            velocity *= self.scratch[:n, None]
+            np.multiply(velocity, ticks, out=self.random[:n])
+            self.position[:n] += self.random[:n]
+        self.life[:n] -= ticks
+
+    def draw(self, surface, left=0):
+        """
+        Draws the living particles as squares of 2 x 2 pixels by writing into the pixels of a surface.
+
+        Parameters:
+        - surface (pygame.Surface): Surface with 32 bits per pixel (e.g. the screen).
+        - left (int, optional): Column of the world at the left border of the surface.
+
+        Returns:
+        - pygame.Rect: Area drawn on (None if no particle is visible).
+        """
+        n = self.used
+        if n == 0:
+            return(None)
+        if self.mapped is None:
+            self.mapped = np.array([surface.map_rgb(tuple(color)) for color in self.palette.reshape(-1, 3)], dtype=np.uint32)
+        width, height = surface.get_size()
+
+        # pixel of every particle, particles that are dead or outside the surface are drawn at (0, 0)
+        column, row, visible, inside = self.column[:n], self.row[:n], self.visible[:n], self.inside[:n]
+        np.subtract(self.position[:n, 0], left, out=self.scratch[:n])
+        np.copyto(column, self.scratch[:n], casting="unsafe")
+        np.copyto(row, self.position[:n, 1], casting="unsafe")
+        np.greater(self.life[:n], 0, out=visible)
+        np.greater_equal(column, 0, out=inside)
+        visible &= inside
+        np.less(column, width - 1, out=inside)
+        visible &= inside
+        np.greater_equal(row, 0, out=inside)
+        visible &= inside
+        np.less(row, height - 1, out=inside)
+        visible &= inside
+        if not visible.any():
+            return(None)
+        x0 = int(np.min(column, where=visible, initial=width))
+        x1 = int(np.max(column, where=visible, initial=0)) + 2
+        y0 = int(np.min(row, where=visible, initial=height))
+        y1 = int(np.max(row, where=visible, initial=0)) + 2
+        column *= visible
+        row *= visible
+
+        # color of every particle, it fades with the age of the particle
+        shade = self.scratch[:n]
+        np.divide(self.life[:n], self.lifetime[:n], out=shade)
+        np.subtract(1, shade, out=shade)
+        shade *= SHADES - 1
+        np.clip(shade, 0, SHADES - 1, out=shade)
+        np.copyto(self.shade[:n], shade, casting="unsafe")
+        self.shade[:n] += self.first_shade[:n]
+        np.take(self.mapped, self.shade[:n], out=self.pixel[:n])
+        pixel = self.pixel[:n]
+
+        pixels = pygame.surfarray.pixels2d(surface)
+        # the pixels the hidden particles are drawn on are restored afterwards
+        np.copyto(self.corner, pixels[:2, :2])
+        pixels[column, row] = pixel
+        column += 1
+        pixels[column, row] = pixel
+        row += 1
+        pixels[column, row] = pixel
+        column -= 1
+        pixels[column, row] = pixel
+        np.copyto(pixels[:2, :2], self.corner)
+        # the surface stays locked as long as the pixel array exists
+        del pixels
+        return(pygame.Rect(x0, y0, x1 - x0, y1 - y0))
+
+    def clear(self):
+        self.life[:self.used] = 0
+        self.used = 0
+        self.cursor = 0
@@ -0,0 +1,91 @@
+import csv
+import time
+import numpy as np
+
+class frame_profiler:
+    """
+    Measures how long the phases of every frame take.
+
+    The time between two calls of mark is added to the phase given to the second call, next_frame ends the frame.
+    The last frames are kept in a ring buffer for the statistics, every frame can also be written to a CSV file.
+    If the profiler is disabled, mark and next_frame return at once.
+
+    Attributes:
+    - phases (list): Names of the phases of a frame.
+    - enabled (bool): If False nothing is measured.
+    - visible (bool): If True the overlay with the statistics is shown.
+    - index (dict): Column of every phase in the ring buffer.
+    - samples (numpy.ndarray): Duration of the phases of the last frames in nanoseconds (one row per frame).
+    - frame (int): Number of frames measured so far.
+    - current (numpy.ndarray): Duration of the phases of the current frame in nanoseconds.
+    - last (int): Time of the last call of mark or next_frame in nanoseconds.
+    - file (file): CSV file the frames are written to (None if no file is written).
+    - writer (csv.writer): Writer of the CSV file.
+
+    Methods:
+    - __init__: Initializes a frame_profiler object.
+    - start: Starts measuring the current frame.
+    - mark: Ends a phase of the current frame.
+    - next_frame: Ends the current frame.
+    - statistics: Returns the median and 99th percentile of every phase.
+    - close: Closes the CSV file.
+    """
+
+    def __init__(self, phases, history=250, csv_path=None, enabled=True):
+        self.phases = list(phases)
+        self.enabled = enabled
+        self.visible = False
+        self.index = {phase: k for k, phase in enumerate(self.phases)}
+        self.samples = np.zeros((history, len(self.phases)), dtype=np.int64)
+        self.frame = 0
+        self.current = np.zeros(len(self.phases), dtype=np.int64)
+        self.last = time.perf_counter_ns()
+        self.file = None
+        self.writer = None
+        if enabled and csv_path is not None:
+            self.file = open(csv_path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(["frame", "total_ms"] + [phase + "_ms" for phase in self.phases])
+
+    def start(self):
+        # the time before (e.g. loading a match) is not counted
+        self.current[:] = 0
+        self.last = time.perf_counter_ns()
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self.current[self.index[phase]] += now - self.last
+        self.last = now
+
+    def next_frame(self):
+        if not self.enabled:
+            return
+        self.samples[self.frame % len(self.samples)] = self.current
+        if self.writer is not None:
+            milliseconds = self.current / 1e6
+            self.writer.writerow([self.frame, f"{milliseconds.sum():.3f}"] + [f"{value:.3f}" for value in milliseconds])
+        self.frame += 1
+        self.current[:] = 0
+        self.last = time.perf_counter_ns()
+
+    def statistics(self):
+        """
+        Returns the median and the 99th percentile of the frame time and of every phase over the last frames.
+
+        Returns:
+        - tuple: Two arrays (median, 99th percentile) in milliseconds, the first entry is the frame time
+          followed by the phases.
+        """
+        frames = self.samples[:min(self.frame, len(self.samples))]
+        if len(frames) == 0:
+            return(np.zeros(len(self.phases) + 1), np.zeros(len(self.phases) + 1))
+        durations = np.column_stack([frames.sum(axis=1), frames]) / 1e6
+        return(np.percentile(durations, 50, axis=0), np.percentile(durations, 99, axis=0))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
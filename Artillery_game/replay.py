@@ -0,0 +1,224 @@
+import argparse
+import struct
+import sys
+import time
+from simulation import simulation
+
+# first bytes of every replay file and version of the format
+MAGIC = b"ARTR"
+VERSION = 4
+# header: magic, version, planet, flags, width, height, seed, number of ticks
+HEADER = struct.Struct("<4sBBBIHQI")
+# flags of the header
+PROCEDURAL = 1  # the ground was generated from noise
+SETTLING = 2    # loose ground fell down
+AIMING = 4      # the computer aimed with the aim solver
+
+def write_varint(value, out):
+    # 7 bits per byte, the highest bit is set if more bytes follow
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return(value, offset)
+        shift += 7
+
+def encode_actions(actions):
+    """
+    Encodes the actions of the player tank of every tick as runs of equal actions.
+
+    Parameters:
+    - actions (list): Action (combination of the action flags of simulation.py) of every tick.
+
+    Returns:
+    - bytearray: Pairs (length of the run as varint, action as byte).
+    """
+    out = bytearray()
+    k = 0
+    while k < len(actions):
+        start = k
+        while k < len(actions) and actions[k] == actions[start]:
+            k += 1
+        write_varint(k - start, out)
+        out.append(actions[start])
+    return(out)
+
+def decode_actions(data, offset=0):
+    actions = []
+    while offset < len(data):
+        run, offset = read_varint(data, offset)
+        actions.extend([data[offset]] * run)
+        offset += 1
+    return(actions)
+
+class recording:
+    """
+    Represents the record of a match: everything needed to simulate the match again.
+
+    A match only depends on the planet, the kind of ground, how the computer aims, the size of the battlefield, the seed
+    and the actions of the player, so only those are stored (a ten minute match takes a few kilobytes).
+
+    Attributes:
+    - planet (int): The chosen planet.
+    - width (int): Width of the battlefield in pixels.
+    - height (int): Height of the battlefield in pixels.
+    - seed (int): Seed of the simulation.
+    - actions (list): Action of the player tank of every tick.
+    - procedural (bool): If True the ground was generated from noise.
+    - settling (bool): If True loose ground fell down.
+    - aiming (bool): If True the computer aimed with the aim solver.
+
+    Methods:
+    - __init__: Initializes a recording object.
+    - record: Adds the action of the next tick.
+    - save: Writes the recording to a file.
+    - load: Reads a recording from a file.
+    - simulation: Creates the simulation of the recorded match.
+    """
+
+    def __init__(self, planet, width, height, seed, actions=None, procedural=False, settling=False, aiming=False):
+        self.planet = planet
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.actions = [] if actions is None else actions
+        self.procedural = procedural
+        self.settling = settling
+        self.aiming = aiming
+
+    def record(self, action):
+        self.actions.append(action)
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            flags = (PROCEDURAL if self.procedural else 0) | (SETTLING if self.settling else 0) | (AIMING if self.aiming else 0)
+            file.write(HEADER.pack(MAGIC, VERSION, self.planet, flags, self.width, self.height, self.seed, len(self.actions)))
+            file.write(encode_actions(self.actions))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            data = file.read()
+        # replays of older versions can not be played (the ground of older versions had no caves)
+        if data[:4] != MAGIC or len(data) < HEADER.size or data[4] != VERSION:
+            raise ValueError(path + " is not a replay of this version of the game")
+        _, _, planet, flags, width, height, seed, ticks = HEADER.unpack_from(data)
+        actions = decode_actions(data, HEADER.size)
+        if len(actions) != ticks:
+            raise ValueError(path + " is damaged (" + str(len(actions)) + " of " + str(ticks) + " ticks)")
+        return(cls(planet, width, height, seed, actions, bool(flags & PROCEDURAL), bool(flags & SETTLING), 
+                   bool(flags & AIMING)))
+
+    def simulation(self):
+        # the generated ground of a replay is saved, it is needed again whenever the replay is watched
+        return(simulation(self.planet, self.width, self.height, seed=self.seed, aiming=self.aiming, 
+                          procedural=self.procedural, settling=self.settling, cache_ground=True))
+
+class replay_player:
+    """
+    Plays a recorded match tick by tick and jumps to any tick of it.
+
+    While the match is played, a snapshot of the simulation (keyframe) is kept every keyframe_interval ticks. Seeking
+    restores the last keyframe before the requested tick and simulates the remaining ticks.
+
+    Attributes:
+    - recording (recording): The recorded match.
+    - keyframe_interval (int): Number of ticks between two keyframes.
+    - keyframes (dict): Snapshots of the simulation keyed by their tick.
+    - sim (simulation): The simulation of the match at the current tick.
+    - tick (int): Number of ticks played.
+
+    Methods:
+    - __init__: Initializes a replay_player object.
+    - finished: Checks if all recorded ticks have been played.
+    - step: Plays the next tick.
+    - seek: Jumps to a tick.
+    """
+
+    def __init__(self, recording, keyframe_interval=250):
+        self.recording = recording
+        self.keyframe_interval = keyframe_interval
+        self.keyframes = {}
+        self.sim = recording.simulation()
+        self.tick = 0
+        self.keyframes[0] = self.sim.snapshot()
+
+    def finished(self):
+        return(self.tick >= len(self.recording.actions))
+
+    def step(self):
+        """
+        Plays the next tick of the match.
+
+        Returns:
+        - list: Events of the tick as returned by simulation.step (empty list if the match is over).
+        """
+        if self.finished():
+            return([])
+        events = self.sim.step({0: self.recording.actions[self.tick]})
+        self.tick += 1
+        if self.tick % self.keyframe_interval == 0 and self.tick not in self.keyframes:
+            self.keyframes[self.tick] = self.sim.snapshot()
+        return(events)
+
+    def seek(self, tick):
+        """
+        Jumps to a tick of the match.
+
+        Parameters:
+        - tick (int): The tick to jump to (clipped to the recorded ticks).
+        """
+        tick = min(max(tick, 0), len(self.recording.actions))
+        # start from the last keyframe before the tick unless the current tick is closer
+        start = max(k for k in self.keyframes if k <= tick)
+        if tick < self.tick or start > self.tick:
+            self.sim.restore(self.keyframes[start])
+            self.tick = start
+        while self.tick < tick:
+            self.step()
+
+def replay_headless(recording):
+    """
+    Simulates a recorded match as fast as possible.
+
+    Parameters:
+    - recording (recording): The recorded match.
+
+    Returns:
+    - simulation: The simulation after the last recorded tick.
+    """
+    sim = recording.simulation()
+    for action in recording.actions:
+        sim.step({0: action})
+    return(sim)
+
+def main(argv=None):
+    """
+    Simulates a recorded match without display and prints its result.
+
+    Parameters:
+    - argv (list, optional): Command line arguments (sys.argv is used if None).
+    """
+    parser = argparse.ArgumentParser(description="Replay a recorded match of the artillery game without display.")
+    parser.add_argument("path", help="replay file")
+    args = parser.parse_args(argv)
+
+    match = recording.load(args.path)
+    start = time.time()
+    sim = replay_headless(match)
+    duration = time.time() - start
+    seconds = len(match.actions) * sim.clock.time_step
+    print(f"{len(match.actions)} ticks ({seconds:.0f} s of play) replayed in {duration:.2f} s", file=sys.stderr)
+    print("score", sim.score(), "winner", "none" if sim.winner is None else sim.winner.counter)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,556 @@
+import numpy as np
+import pickle
+import random
+from tank import tank, missile_pool, AI_enemy, ANGLES, AIM_BUDGET
+from trajectory import trajectory_table
+from terrain import terrain
+from heightmap import heightmap_to_ground
+from broadphase import uniform_grid
+from clock import tick_clock
+
+# actions of a tank during one step of the simulation (can be combined with |)
+MOVE_LEFT = 1
+MOVE_RIGHT = 2
+MOVE_STOP = 4
+ANGLE_UP = 8
+ANGLE_DOWN = 16
+SHOOT = 32
+
+# width of the battlefield in pixels: the tanks start on it and the ground functions are made for it
+# (in wider worlds the battlefield lies in the middle)
+BATTLEFIELD_WIDTH = 930
+# the broadphase grid is only built if there are more pairs of tanks and missiles
+BROADPHASE_PAIRS = 64
+
+def collision(rect1, rect2):
+    """
+    Checks if two rectangles overlap. The coordinates can also be numpy arrays to check several rectangles at once.
+
+    Parameters:
+        rect1 (list): List containing the coordinates and dimensions of the first rectangle [x, y, width, height].
+        rect2 (list): List containing the coordinates and dimensions of the second rectangle [x, y, width, height].
+
+    Returns:
+        bool: Boolean value (or array) indicating whether the rectangles overlap.
+    """
+
+    # extract coordinates and dimensions of rectangles
+    x1, y1 = rect1[0] # upper left coordinates of rectangle 1
+    w1, h1 = rect1[1:] # length and height of rectangle 1
+    x2, y2 = rect2[0] # upper left coordinates of rectangle 2
+    w2, h2 = rect2[1:] # length and height of rectangle 2
+
+    # check overlap along x-axis
+    overlap_x = (x1 < x2 + w2) & (x2 < x1 + w1)
+
+    # check overlap along y-axis
+    overlap_y = (y1 < y2 + h2) & (y2 < y1 + h1)
+
+    # Return True if rectangles overlap both along x-axis and y-axis
+    return(overlap_x & overlap_y)
+
+def func_to_ground(f, width, height, offset=0): 
+    """
+    Converts a given function to a terrain object. The columns are only computed when a chunk of the terrain
+    is needed.
+
+    The ground functions describe a battlefield of BATTLEFIELD_WIDTH pixels. Columns left or right of it
+    mirror the profile, so the ground of a wider world continues without steps.
+
+    Parameters:
+        f (function): Function representing the ground profile.
+        width (int): Width of the ground in pixels.
+        height (int): Height of the ground in pixels.
+        offset (int, optional): Column of the ground where the battlefield starts.
+
+    Returns:
+        terrain: Terrain object representing the ground.
+    """
+    def generate(c0, c1): 
+        # position of the columns within the battlefield, mirrored at its borders (all columns at once)
+        x = (np.arange(c0, c1) - offset) % (2 * BATTLEFIELD_WIDTH)
+        x = np.where(x >= BATTLEFIELD_WIDTH, 2 * BATTLEFIELD_WIDTH - 1 - x, x)
+        m = f(x).astype(np.int64)
+        # row of the topmost ground pixel (function values below 1 yield an empty column)
+        return((height - np.clip(m, 0, height)).astype(np.int16))
+    return(terrain(generate, width, height))
+
+def update_ground(positions, ground, destruction_radius): 
+    """
+    Updates the ground based on the impact of missiles.
+
+    Parameters:
+        positions (numpy.ndarray): Positions of the missiles in pixels, one row per missile.
+        ground (terrain): Terrain object representing the ground.
+        destruction_radius (int): Integer specifying the radius of destruction caused by the missile.
+
+    Returns:
+        numpy.ndarray: Boolean array indicating for every missile whether it hit the ground or left the screen.
+    """
+    
+    m = positions[:, 0]
+    n = positions[:, 1]
+
+    # indicates that missile is out of screen
+    out = ~((0 <= m) & (m < ground.width - 2) & (n < ground.height - 2))
+
+    # missiles with ground within 2 pixels 
+    hit = ~out & (n > 2)
+    hit[hit] = ground.touches(n[hit], m[hit], 2)
+
+    # remove ground where it was hit by a missile
+    for k in hit.nonzero()[0]: 
+        ground.carve(int(n[k]), int(m[k]), destruction_radius)
+
+    return(out | hit)
+    
+def ground_earth(x): 
+    """
+    Calculates the height of the ground at a given x-coordinate on Earth.
+
+    Parameters:
+    - x (float): The x-coordinate at which to calculate the height of the ground.
+
+    Returns:
+    - float: The height of the ground at the specified x-coordinate on Earth.
+    """
+    return(60 * np.sin(x / 45) + 150 + 0.12*x)
+
+def ground_moon(x): 
+    """
+    Calculates the height of the ground at a given x-coordinate on the Moon.
+
+    Parameters:
+    - x (float): The x-coordinate at which to calculate the height of the ground.
+
+    Returns:
+    - float: The height of the ground at the specified x-coordinate on the Moon.
+    """
+    return(- 10**(-3.6) * (x-480)**2 + 200 - 5 * np.sin(x / 25))
+
+def ground_mars(x):
+    """
+    Calculates the height of the ground at a given x-coordinate on Mars.
+
+    Parameters:
+    - x (float): The x-coordinate at which to calculate the height of the ground.
+
+    Returns:
+    - float: The height of the ground at the specified x-coordinate on Mars.
+    """
+    return(150 + 40 * np.sin(x / 80) + 30 * np.cos(x / 30) + 15 * np.sin(x / 300) )
+
+def ground_ice(x):
+    """
+    Calculates the height of the ground at a given x-coordinate on an ice planet.
+
+    Parameters:
+    - x (float): The x-coordinate at which to calculate the height of the ground.
+
+    Returns:
+    - float: The height of the ground at the specified x-coordinate on the ice planet.
+    """
+    # Define the range of y values
+    y_min = 150
+    y_max = 400
+    
+    # Normalize x to the range [0, period)
+    x_normalized = x % 60
+    
+    # Map x_normalized to the range [y_min, y_max]
+    return( y_min + 0.5 * (y_max - y_min) * (x_normalized / 100)  + 20 * np.cos(x / 30))
+
+def gradient(tank_pos, move_direction, ground):
+    """
+    Calculates the gradient (slope) of the ground at the current position of the tank.
+
+    Parameters:
+    - tank_pos (tuple): A tuple containing the current position of the tank in the form (x, y).
+    - move_direction (int): The direction in which the tank is moving (-1 for left, 1 for right).
+    - ground (terrain): Terrain object representing the ground.
+
+    Returns:
+    - float: The gradient (slope) of the ground at the current position of the tank.
+    """
+    # x coordinate 4 steps in moving direction (less than 4 steps yields low variability in gradient values)
+    column_tank = min(max(int(tank_pos[0]) + 4 * move_direction, 0), ground.width - 1)
+    # new height of tank: the ground beneath a point 10 pixels above the tank (ground right above it is a wall,
+    # a cave ceiling higher up is ignored)
+    y_tank = ground.floor(tank_pos[1] - 10, column_tank)
+    # increase / decrease in height of tank (when going 4 steps / pixel in moving direction)
+    gradient = -(y_tank - tank_pos[1])
+    return(gradient)
+
+def moving_speed(grad_tank): 
+    """
+    Calculates the moving speed of the tank based on the gradient of the ground.
+
+    Parameters:
+    - grad_tank (float): The gradient (slope) of the ground at the current position of the tank.
+
+    Returns:
+    - float: The moving speed of the tank.
+    """
+    if grad_tank > 8: 
+        speed = 0
+    elif grad_tank in [4, 5, 6, 7]: 
+        speed = 2
+    elif grad_tank in [2, 3]:
+        speed = 2.5
+    elif grad_tank in [-1, 0, 1]: 
+        speed = 3
+    elif -8 < grad_tank < -1: 
+        speed = 4
+    else:
+        speed = 5
+    return(speed)
+
+
+def planet_settings(planet): 
+    """
+    Returns the physical settings of a planet.
+
+    Parameters:
+    - planet (int): An integer representing the chosen planet (1 for Earth, 2 for Moon, 3 for Mars, 4 for Ice Planet).
+
+    Returns:
+    - tuple: Gravity, norm of the initial velocity of the missiles and the function of the ground profile.
+    """
+    if planet == 1: 
+        # earth 
+        return(9.81, 95, ground_earth)
+    elif planet == 2: 
+        # moon
+        return(1.62, 40, ground_moon)
+    elif planet == 3: 
+        # mars
+        return(3.71, 60, ground_mars)
+    else:
+        # ice planet 
+        return(12, 100, ground_ice)
+
+class simulation: 
+    """
+    Represents a match of the artillery game without any display or user input.
+
+    Every match has its own ground, tanks and AI enemies, so several matches can be simulated at the same time.
+    The simulation only depends on its seed and the actions of the players: time is counted in frames by a 
+    tick_clock and all random decisions use the random number generator of the match.
+
+    Attributes:
+    - planet (int): The chosen planet.
+    - g (float): Gravity of the planet.
+    - vel_norm (float): Norm of the initial velocity of the missiles.
+    - width (int): Width of the world in pixels (may be wider than the window).
+    - height (int): Height of the world in pixels.
+    - destruction_radius (int): Radius of destruction from missiles.
+    - procedural (bool): If True the ground is generated from noise (see heightmap.py) instead of the planet function.
+    - settling (bool): If True loose ground above craters falls down over the next frames (see terrain.settle).
+    - ground (terrain): Terrain object representing the ground.
+    - tanks (list): The tanks of the match, the tank number is the index in the list.
+    - missiles (missile_pool): All missiles in the air.
+    - boxes (numpy.ndarray): Hitboxes of the tanks as rows [x, y, width, height].
+    - teams (numpy.ndarray): Team of every tank.
+    - grid (uniform_grid): Broadphase for the collision control of missiles and tanks (only used with many pairs of 
+      tanks and missiles, see BROADPHASE_PAIRS).
+    - computers (dict): AI enemies controlling tanks, keyed by the tank number.
+    - winner (tank): The tank that has won the match (None while the match is running).
+    - clock (tick_clock): Clock of the simulation (one tick per frame).
+    - rng (random.Random): Random number generator of the match.
+    - pause (int): Number of frames the match is paused after a tank was destroyed.
+    - profiler (frame_profiler): Measures the phases of step (None if nothing is measured).
+
+    Methods:
+    - __init__: Initializes a simulation object.
+    - score: Returns the score of the match.
+    - step: Advances the match by one frame.
+    - respawn: Starts a new round.
+    - snapshot: Returns the state of the match.
+    - restore: Sets the match to the state of a snapshot.
+    """
+
+    # attributes of the tanks and AI enemies that change during a match
+    tank_fields = ["position", "frame", "angle", "num_missiles", "life", "move_direction", "move_direction_previous", 
+                   "points", "shots", "hits", "last_reloaded"]
+    computer_fields = ["distance", "time_decision_shooting", "time_decision_moving", "aim_frame"]
+
+    def __init__(self, planet, width=930, height=720, computer_tanks=(1,), num_tanks=2, teams=None, seed=None, time_step=1 / 25, 
+                 aiming=False, aim_budget=AIM_BUDGET, procedural=False, settling=False, cache_ground=False): 
+        self.planet = planet
+        self.g, self.vel_norm, ground_func = planet_settings(planet)
+        self.width = width
+        self.height = height
+        self.destruction_radius = 12
+        self.clock = tick_clock(time_step)
+        self.rng = random.Random(seed)
+        self.pause = 0
+
+        # create terrain from given function (the battlefield lies in the middle of the world) or from noise
+        # seeded by the match, so every seed has its own ground
+        offset = max(width - BATTLEFIELD_WIDTH, 0) // 2
+        self.procedural = procedural
+        if procedural: 
+            self.ground = heightmap_to_ground(planet, self.rng.getrandbits(64), width, height, cache_ground)
+        else: 
+            self.ground = func_to_ground(ground_func, width, height, offset)
+        self.settling = settling
+        self.ground.settling = settling
+
+        # tanks are spread evenly over the battlefield, every tank is its own team unless teams are given
+        self.missiles = missile_pool(self.g, height)
+        spacing = (min(width, BATTLEFIELD_WIDTH) - 100) / max(num_tanks - 1, 1)
+        self.tanks = [tank(width, height, k, self.missiles, self.clock, int(offset + 50 + k * spacing), None if teams is None else teams[k]) 
+                      for k in range(num_tanks)]
+        # hitboxes of the tanks as rows [x, y, width, height] (only the corner moves) and the teams of the tanks
+        self.boxes = np.tile(np.array([0, 0, 35, 25], dtype=float), (num_tanks, 1))
+        self.teams = np.array([panzer.team for panzer in self.tanks])
+        self.grid = uniform_grid()
+        self.computers = {k: AI_enemy(self.tanks[k], self.clock, self.rng, aiming, aim_budget) for k in computer_tanks}
+        self.winner = None
+        self.profiler = None
+
+    def score(self): 
+        return(" : ".join(str(panzer.points) for panzer in self.tanks))
+
+    def step(self, actions=None): 
+        """
+        Advances the match by one frame.
+
+        Parameters:
+        - actions (dict, optional): Actions (MOVE_LEFT, MOVE_RIGHT, MOVE_STOP, ANGLE_UP, ANGLE_DOWN, SHOOT combined with |) 
+          keyed by the tank number. Tanks controlled by the computer ignore actions.
+
+        Returns:
+        - list: Events of the frame as tuples (kind, position): kind "hit" if a missile hit a tank, "crater" if a missile 
+          hit the ground or left the screen, "round" if a tank was destroyed and "winner" if the match is over.
+        """
+        events = []
+        self.clock.advance()
+
+        # short break after a tank was destroyed
+        if self.pause > 0: 
+            self.pause -= 1
+            return(events)
+
+        # actions of the players (in the order of the tanks, so the order of the dictionary does not matter)
+        for k, action in sorted((actions or {}).items()): 
+            panzer = self.tanks[k]
+            if k in self.computers: 
+                continue
+            if action & MOVE_RIGHT: 
+                panzer.move_direction = 1
+            elif action & MOVE_LEFT: 
+                panzer.move_direction = - 1
+            elif action & MOVE_STOP: 
+                panzer.move_direction = 0
+            if action & ANGLE_UP: 
+                panzer.angle_adjust("pos")
+            elif action & ANGLE_DOWN: 
+                panzer.angle_adjust("neg")
+            if action & SHOOT: 
+                panzer.shoot(self.vel_norm)
+
+        # AI decisions
+        for k, computer in self.computers.items(): 
+            tank_computer = self.tanks[k]
+            computer.decision_running(tank_computer)
+            if computer.aiming: 
+                targets = [panzer for panzer in self.tanks if panzer.team != tank_computer.team and panzer.life > 0]
+                computer.decision_aiming(tank_computer, targets, self.g, self.vel_norm, self.ground)
+            else: 
+                computer.decision_shooting(tank_computer, self.vel_norm)
+            computer.decision_reloading(tank_computer)
+            computer.decision_movement(tank_computer)
+        if self.profiler is not None: 
+            self.profiler.mark("ai")
+
+        # loose ground falls before the tanks, so tanks standing on it fall with it
+        if self.settling: 
+            self.ground.settle()
+
+        for k, panzer in enumerate(self.tanks): 
+            # if the tank is in the air its y-coordinate is changed in every iteration such that the tank falls to the ground
+            panzer.falling(self.ground)
+
+            # reload ammunition 
+            panzer.reloading()
+            
+            # if tank is moving: 
+            if not panzer.move_direction == 0:
+                
+                # gradient of current position of tank
+                grad = gradient(panzer.position, panzer.move_direction, self.ground) 
+                # new x-coordinate of tank 1
+                panzer.position[0] += moving_speed(grad) * panzer.move_direction 
+                panzer.position[0] = min(max(panzer.position[0], 0), self.width - 20)
+                # coresponding new column of tank 1 
+                column_tank = int(panzer.position[0])
+                # coresponding new row of tank 1
+                row_tank = self.ground.floor(panzer.position[1] - 10, column_tank)
+
+                # new height of the tank:     
+                # if there is ground beneath the tank the height changes by falling (see falling function)
+                # and not by moving
+                if self.ground.is_ground(panzer.position[1] + 10, panzer.position[0]):
+                    panzer.position[1] = row_tank 
+
+            # hitbox of tank 
+            self.boxes[k, 0] = panzer.position[0] - 13 - 5 * panzer.facing
+            self.boxes[k, 1] = panzer.position[1] - 20
+        if self.profiler is not None: 
+            self.profiler.mark("tanks")
+
+        # update positions of every missile that is in the air 
+        missiles = self.missiles
+        if missiles.count == 0: 
+            return(events)
+        missiles.position_update(self.ground)
+        positions = missiles.position[:missiles.count]
+        owners = missiles.owner[:missiles.count]
+
+        # broadphase: sort the hitboxes of the tanks into a grid (enlarged by half the size of a missile), with 
+        # few tanks and missiles testing every pair is faster than building the grid
+        boxes = self.boxes
+        teams = self.teams
+        if len(self.tanks) * missiles.count > BROADPHASE_PAIRS: 
+            self.grid.build(boxes, 10)
+            candidates, candidate_tanks = self.grid.query(positions)
+
+            # collision control if missiles hit tanks of other teams
+            box = boxes[candidate_tanks]
+            hits = (teams[owners[candidates]] != teams[candidate_tanks]) & collision([[box[:, 0], box[:, 1]], box[:, 2], box[:, 3]], 
+                [[positions[candidates, 0] - 10, positions[candidates, 1] - 10], 20, 20])
+            # a missile explodes at the first tank it hits (the one with the lowest number, whichever broadphase is used)
+            if hits.any(): 
+                order = np.lexsort((candidate_tanks[hits], candidates[hits]))
+                hit_missiles, first = np.unique(candidates[hits][order], return_index=True)
+                hit_tanks = candidate_tanks[hits][order][first]
+            else: 
+                hit_missiles = hit_tanks = []
+        else: 
+            # every pair in turn (for a few pairs the NumPy calls cost more than the tests)
+            hit_missiles, hit_tanks = [], []
+            teams = teams.tolist()
+            hitboxes = boxes.tolist()
+            for k, ((x, y), owner) in enumerate(zip(positions.tolist(), owners.tolist())): 
+                for j, (x_box, y_box, w_box, h_box) in enumerate(hitboxes): 
+                    if teams[j] != teams[owner] and collision([[x_box, y_box], w_box, h_box], [[x - 10, y - 10], 20, 20]): 
+                        hit_missiles.append(k)
+                        hit_tanks.append(j)
+                        break
+
+        for k, j in zip(hit_missiles, hit_tanks): 
+            panzer = self.tanks[owners[k]]
+            enemy = self.tanks[j]
+            enemy.life -= 50
+            panzer.hits += 1
+
+            # save distance of last missile to computer tank for ai decision making
+            for computer in self.computers.values(): 
+                computer.distance = 0
+                
+            events.append(("hit", positions[k].copy()))
+            # remove missile
+            missiles.alive[k] = False
+
+            # if one of the tanks has no life left
+            if enemy.life == 0: 
+                # update score of other tank
+                panzer.points += 1
+                if panzer.points == 3: 
+                    # the match is over when one tank reaches 3 points
+                    self.winner = panzer
+                    events.append(("winner", panzer.position))
+                    return(events)
+                else:  
+                    events.append(("round", enemy.position))
+                    # set life of destroyed tank to 100
+                    enemy.life = 100
+                    self.respawn()
+                    self.pause = round(0.2 / self.clock.time_step)
+                    return(events)
+
+        # updates ground if hit by missiles (only missiles that did not hit a tank)
+        alive = missiles.alive[:missiles.count].nonzero()[0]
+        exploded = alive[update_ground(positions[alive], self.ground, self.destruction_radius)]
+        for k in exploded: 
+            events.append(("crater", positions[k].copy()))
+
+            # update distance of enemy missiles to computer tanks (for AI decision making)
+            for j, computer in self.computers.items(): 
+                if self.tanks[j].team != self.tanks[owners[k]].team: 
+                    computer.distance = min(computer.distance, abs(positions[k, 0] - self.tanks[j].position[0]))
+
+        # remove missiles that exploded or hit a tank
+        if len(exploded) or len(alive) < missiles.count: 
+            missiles.alive[exploded] = False
+            missiles.compact()
+
+        return(events)
+
+    def respawn(self): 
+        # delete all current missiles that are in the air
+        self.missiles.clear()
+        for tnk in self.tanks: 
+            # respawn tanks
+            tnk.position = tnk.spawn.copy()
+            # instant reloading of missiles
+            tnk.num_missiles = 3
+
+    def snapshot(self): 
+        """
+        Returns the state of the match. The snapshot is independent of the simulation, so the match can be 
+        continued and restored later (e.g. to rewind or to try different actions).
+
+        The ground is stored as the masks of the chunks changed by craters, the tanks as one array per attribute.
+
+        Returns:
+        - dict: The state of the match (see snapshot_to_bytes to store it).
+        """
+        state = self.rng.getstate()
+        return({
+            "tick": self.clock.tick,
+            "pause": self.pause,
+            "winner": - 1 if self.winner is None else self.winner.counter,
+            "rng": (state[0], np.array(state[1], dtype=np.uint32), state[2]),
+            "ground": self.ground.snapshot(),
+            "unsettled": list(self.ground.unsettled),
+            "tanks": {field: np.array([getattr(panzer, field) for panzer in self.tanks]) for field in simulation.tank_fields},
+            "computers": {k: [getattr(computer, field) for field in simulation.computer_fields] for k, computer in self.computers.items()},
+            "missiles": self.missiles.snapshot(),
+        })
+
+    def restore(self, snapshot): 
+        """
+        Sets the match to the state of a snapshot of this match (same planet, size and tanks).
+
+        Parameters:
+        - snapshot (dict): State of the match as returned by snapshot.
+        """
+        self.clock.tick = snapshot["tick"]
+        self.pause = snapshot["pause"]
+        self.winner = None if snapshot["winner"] == - 1 else self.tanks[snapshot["winner"]]
+        version, words, gauss = snapshot["rng"]
+        self.rng.setstate((version, tuple(int(word) for word in words), gauss))
+
+        # only the columns that differ have to be drawn again
+        self.ground.restore(snapshot["ground"])
+        self.ground.unsettled = list(snapshot["unsettled"])
+
+        for field, values in snapshot["tanks"].items(): 
+            for panzer, value in zip(self.tanks, values): 
+                setattr(panzer, field, value.copy() if field == "position" else value.item())
+        for k, values in snapshot["computers"].items(): 
+            for field, value in zip(simulation.computer_fields, values): 
+                setattr(self.computers[k], field, value)
+
+        self.missiles.restore(snapshot["missiles"], trajectory_table(self.g, self.vel_norm, self.height, ANGLES))
+
+def snapshot_to_bytes(snapshot): 
+    # a snapshot of two tanks takes about 3 kB (mostly the state of the random number generator) plus 1 to 2 kB per 
+    # cratered chunk (see terrain.snapshot)
+    return(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+
+def snapshot_from_bytes(data): 
+    # only load snapshots written by snapshot_to_bytes, unpickling can execute code
+    return(pickle.loads(data))
@@ -0,0 +1,116 @@
+import math
+import numpy as np
+import pygame
+from cache import cache_path, read_cache, write_cache
+
+# angles of the cannon in the images of tanks_imgs
+SOURCE_ANGLES = [-40, -10, 0, 20, 50, 80]
+# pixel of the tank images around which the cannon turns
+PIVOT = (29, 33)
+
+def load_sources(player):
+    """
+    Loads the images of a tank and splits them into the hull and the cannon.
+
+    The hull consists of the pixels shared by all images (the smallest alpha value of every pixel), the cannon
+    of the pixels of the 0 degree image that are not part of the hull.
+
+    Parameters:
+    - player (str): A string indicating the player / computer for whom tank images are to be loaded.
+
+    Returns:
+    - tuple: Hull and cannon as pygame.Surface objects, both facing to the right.
+    """
+    images = []
+    for angle in SOURCE_ANGLES:
+        image = pygame.image.load("tanks_imgs/" + player + "_" + str(angle) + "_deg.png")
+        # the computer images face to the left
+        images.append(pygame.transform.flip(image, True, False) if player == "computer" else image)
+    alpha = np.stack([pygame.surfarray.array_alpha(image) for image in images])
+    shared = alpha.min(axis=0)
+
+    straight = SOURCE_ANGLES.index(0)
+    hull = images[straight].copy()
+    pygame.surfarray.pixels_alpha(hull)[:] = shared
+
+    # the cannon lies right of the pivot and above the tracks
+    cannon = images[straight].copy()
+    x, y = np.indices(shared.shape)
+    cannon_alpha = pygame.surfarray.pixels_alpha(cannon)
+    cannon_alpha[~((x >= PIVOT[0]) & (y <= PIVOT[1] + 4) & (alpha[straight] > shared))] = 0
+    del cannon_alpha # unlocks the surface
+    return(hull, cannon)
+
+def build_atlas(player, angles):
+    """
+    Draws a tank for every angle of the cannon into one surface (the atlas). The sprites are packed into a grid of
+    square cells, the sprite of angles[k] lies in row k // columns and column k % columns.
+
+    Parameters:
+    - player (str): A string indicating the player / computer for whom the atlas is built.
+    - angles (list): Angles of the cannon in degrees.
+
+    Returns:
+    - pygame.Surface: The atlas, all tanks face to the right.
+    """
+    hull, cannon = load_sources(player)
+    size = hull.get_width()
+    columns = math.ceil(math.sqrt(len(angles)))
+    atlas = pygame.Surface((columns * size, math.ceil(len(angles) / columns) * size), pygame.SRCALPHA)
+
+    # the cannon is centered on the pivot of a larger canvas, rotating keeps the center in place
+    canvas = pygame.Surface((2 * size, 2 * size), pygame.SRCALPHA)
+    canvas.blit(cannon, (size - PIVOT[0], size - PIVOT[1]))
+    for k, angle in enumerate(angles):
+        cell = pygame.Rect((k % columns) * size, (k // columns) * size, size, size)
+        rotated = pygame.transform.rotozoom(canvas, angle, 1)
+        # the cannon is drawn first, so the hull covers its inner end
+        atlas.set_clip(cell)
+        atlas.blit(rotated, rotated.get_rect(center=(cell.x + PIVOT[0], cell.y + PIVOT[1])))
+        atlas.blit(hull, cell)
+    atlas.set_clip(None)
+    return(atlas)
+
+class sprite_atlas:
+    """
+    Represents the pre-rendered images of a tank for all angles of its cannon, packed into one surface.
+
+    The atlas is built once (and saved in CACHE_DIR), drawing a tank only blits a part of the atlas.
+
+    Attributes:
+    - surface (pygame.Surface): The atlas, converted to the format of the display.
+    - rects (list): Part of the atlas showing the tank with the cannon at angles[k] for every k.
+
+    Methods:
+    - __init__: Initializes a sprite_atlas object.
+    - draw: Draws the tank at a given frame.
+    """
+
+    def __init__(self, player, angles, facing=1):
+        # the name of the cached atlas depends on the angles and the source images
+        sources = []
+        for angle in SOURCE_ANGLES:
+            with open("tanks_imgs/" + player + "_" + str(angle) + "_deg.png", "rb") as file:
+                sources.append(file.read())
+        path = cache_path("atlas_" + player + "_", (tuple(angles), PIVOT, tuple(sources)), ".png")
+
+        surface = read_cache(path, pygame.image.load)
+        if surface is None:
+            surface = build_atlas(player, angles)
+            write_cache(path, lambda file: pygame.image.save(surface, file, "atlas.png"))
+
+        # same grid as in build_atlas
+        columns = math.ceil(math.sqrt(len(angles)))
+        size = surface.get_width() // columns
+        if facing == - 1:
+            # flipping the atlas mirrors the order of the columns
+            surface = pygame.transform.flip(surface, True, False)
+        self.surface = surface.convert_alpha()
+        self.rects = []
+        for k in range(len(angles)):
+            column = k % columns if facing == 1 else columns - 1 - k % columns
+            self.rects.append(pygame.Rect(column * size, (k // columns) * size, size, size))
+
+    def draw(self, screen, frame, position):
+        # frame k shows the cannon at angles[k - 1], the area drawn on is returned
+        return(screen.blit(self.surface, position, self.rects[frame - 1]))
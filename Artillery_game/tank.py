@@ -1,26 +1,39 @@
 import numpy as np
-import random 
-import time
-import math
+from trajectory import trajectory_table
+
+# possible angles of the cannon in steps of one degree (frame k of a tank shows the angle ANGLES[k - 1])
+ANGLES = list(range(-40, 81))
+# the aim solver first evaluates every AIM_COARSE-th angle, then the angles around the best one
+AIM_COARSE = 8
+# largest number of missile positions the aim solver evaluates per decision (see aim_solver)
+AIM_BUDGET = 8192
+# up to this many missiles are moved one after the other (for a few missiles the NumPy calls cost more than the 
+# arithmetic)
+SCALAR_MISSILES = 8
 
 class tank: 
     """
     Represents a tank object in the game.
 
     Attributes:
-    - counter (int): A class variable to keep track of the number of tanks created.
+    - counter (int): Number of the tank (0 for the player tank).
+    - team (int): Team of the tank, missiles do not hit tanks of the own team.
+    - spawn (numpy.ndarray): Position of the tank at the start of a round.
+    - facing (int): Direction the cannon of the tank points to (1 for right, -1 for left).
     - position (numpy.ndarray): Current position of the tank.
     - max_position (list): Maximum allowed position of the tank.
     - frame (int): Current frame of the tank's animation.
     - angle (int): Current angle of the tank's cannon.
-    - missiles (list): List of missiles fired by the tank.
+    - missiles (missile_pool): Missiles in the air (shared by all tanks of a match).
     - num_missiles (int): Number of missiles available for the tank to fire.
     - life (int): Current life points of the tank.
     - move_direction (int): Direction of tank movement (-1 for left, 1 for right, 0 for no movement).
     - move_direction_previous (int): Previous direction of tank movement.
-    - imgs (list): Images representing the tank's animation.
     - points (int): Score accumulated by the tank.
+    - shots (int): Number of missiles fired by the tank.
+    - hits (int): Number of missiles fired by the tank that hit another tank.
     - last_reloaded (float): Timestamp of the last missile reload.
+    - clock (tick_clock): Clock of the simulation.
 
     Methods:
     - __init__: Initializes a tank object.
@@ -30,35 +43,41 @@ class tank:
     - falling: Simulates the tank's falling motion.
     - angle_adjust: Adjusts the cannon angle of the tank.
     """
-    counter = -1
-
-    def __init__(self, window_width, window_height, imgs):
-        tank.counter += 1 # first (player) tank gets the number 0, computer tank gets the number 1 
-        self.counter = tank.counter
+    def __init__(self, window_width, window_height, counter, missiles, clock, spawn_x=None, team=None):
+        self.counter = counter # first (player) tank gets the number 0
+        self.team = counter if team is None else team
         self.max_position = [window_width, window_height]
-        self.position = np.array([50 + self.counter * 830, 150])
-        self.frame = 3
+        if spawn_x is None: 
+            spawn_x = 50 + self.counter * 830
+        self.spawn = np.array([spawn_x, 150])
+        # tanks in the left half of the battlefield shoot to the right and vice versa 
+        self.facing = 1 if spawn_x < window_width / 2 else -1
+        self.position = self.spawn.copy()
+        self.frame = ANGLES.index(0) + 1
         self.angle = 0
-        self.missiles = []
+        self.missiles = missiles
         self.num_missiles = 3
         self.life = 100
         self.move_direction = 0
         self.move_direction_previous = 0
-        self.imgs = imgs
         self.points = 0 
+        self.shots = 0
+        self.hits = 0
         self.last_reloaded = 0 # last time missiles were reloaded
+        self.clock = clock
         
     def shoot(self, vel_norm): 
         if self.num_missiles > 0: # no shooting while missiles are reloading
-            self.missiles.append(missile(self.angle, self.position + np.array([0, - 10]), self.counter, vel_norm))
+            self.missiles.launch(self.angle, self.position + np.array([0, - 10]), self.counter, vel_norm, self.facing)
             self.num_missiles -= 1
+            self.shots += 1
             self.reload = False # end reloading if missiles are fired
         
     def reloading(self): 
-        if self.num_missiles < 3 and time.time() - self.last_reloaded > 1: 
+        if self.num_missiles < 3 and self.clock.time() - self.last_reloaded > 1: 
         # reload at most 1 missile per 1 second
             self.num_missiles += 1
-            self.last_reloaded = time.time()
+            self.last_reloaded = self.clock.time()
             
 
     def move(self, move_direction): 
@@ -72,71 +91,237 @@ class tank:
         m = int(self.position[0])
         n = int(self.position[1]) 
 
-        if ground[n+1, m] == 1: 
+        if ground.is_ground(n+1, m): 
             self.move_direction_previous = self.move_direction
 
-        if ground[n+1, m] == 0: 
+        if not ground.is_ground(n+1, m): 
             # set moving direction to 0 while falling
             self.move_direction = 0
             # falling at most 10 pixel per iteration such that the tank lands exactly on the ground
-            self.position[1] += min(12, np.where(ground[:, m] == 0)[0][-1] - n ) + 1
+            # (the ground beneath the tank, which may be the floor of a cave)
+            self.position[1] += min(12, ground.floor(n + 1, m) - 1 - n ) + 1
 
             # while falling the moving direction was 0, i.e. there was no horicontal movement of the tank 
             # when the tank lands the movement before the fall should continue without having to press 
             # 'right' / 'left' again
-            if ground[self.position[1],self.position[0]] == 1:
+            if ground.is_ground(self.position[1], self.position[0]):
                 self.move_direction = self.move_direction_previous
                
       
-    def angle_adjust(self, direction):
-        angles = [-40, -10, 0, 20, 50, 80] # possible angels
-        if direction == "pos" and self.frame < 6: 
-            self.angle = angles[self.frame]
-            self.frame += 1
-        elif direction == "neg" and self.frame > 1: 
-            self.angle = angles[self.frame - 2]
-            self.frame -= 1
+    def angle_adjust(self, direction, steps=1):
+        # turns the cannon by a number of angles (one degree each), but not beyond the first / last angle
+        if direction == "pos": 
+            self.frame = min(self.frame + steps, len(ANGLES))
+        elif direction == "neg": 
+            self.frame = max(self.frame - steps, 1)
+        self.angle = ANGLES[self.frame - 1]
         
     
-class missile: 
+class missile_pool: 
     """
-    Represents a missile object in the game.
+    Represents all missiles in the air, stored as contiguous arrays with one entry per missile.
+
+    The flight paths are read from the trajectory table of the planet (see trajectory.py), so all missiles are 
+    advanced together by one table lookup. Missiles that exploded are removed by moving the remaining missiles 
+    to the front of the arrays.
 
     Attributes:
-    - angle (float): Launch angle of the missile.
-    - v_init (numpy.ndarray): Initial velocity vector of the missile.
-    - position_prev (numpy.ndarray): Previous position of the missile.
-    - position_cur (numpy.ndarray): Current position of the missile.
+    - g (float): Gravity of the planet.
+    - height (int): Height of the battlefield.
+    - table (numpy.ndarray): Trajectory table of the missiles.
+    - count (int): Number of missiles in the air (only the first count entries of the arrays are used).
+    - origin (numpy.ndarray): Initial positions of the missiles.
+    - angle_index (numpy.ndarray): Index of the launch angle of the missiles in ANGLES.
+    - direction (numpy.ndarray): Direction of the missiles (1 for right, -1 for left).
+    - age (numpy.ndarray): Number of steps since the missiles were fired.
+    - position_prev (numpy.ndarray): Previous positions of the missiles.
+    - position_cur (numpy.ndarray): Current positions of the missiles.
+    - position (numpy.ndarray): Current positions of the missiles in pixels.
+    - owner (numpy.ndarray): Numbers of the tanks that fired the missiles.
+    - alive (numpy.ndarray): Boolean mask of the missiles that are still in the air.
 
     Methods:
-    - __init__: Initializes a missile object.
-    - position_update: Updates the position of the missile based on gravity and terrain collision.
+    - __init__: Initializes a missile_pool object.
+    - launch: Adds a missile fired by a tank.
+    - position_update: Updates the positions of all missiles based on the trajectory table and terrain collision.
+    - compact: Removes the missiles that are no longer alive.
+    - clear: Removes all missiles.
+    - snapshot: Returns a copy of the missiles in the air.
+    - restore: Replaces the missiles by the missiles of a snapshot.
     """
+    arrays = ["origin", "angle_index", "direction", "age", "position_prev", "position_cur", "position", "owner", "alive"]
 
+    def __init__(self, g, height, capacity=16): 
+        self.g = g
+        self.height = height
+        self.table = None
+        self.count = 0
+        self.origin = np.zeros((capacity, 2))
+        self.angle_index = np.zeros(capacity, dtype=np.int16)
+        self.direction = np.zeros(capacity, dtype=np.int8)
+        self.age = np.zeros(capacity, dtype=np.int32)
+        self.position_prev = np.zeros((capacity, 2))
+        self.position_cur = np.zeros((capacity, 2))
+        self.position = np.zeros((capacity, 2), dtype=int)
+        self.owner = np.zeros(capacity, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
 
-    def __init__(self, angle, init_position, counter, vel_norm): 
-        time_step = 0.2
-        self.counter = counter
-        self.angle = math.radians(angle)
-        
-        self.v_init = np.array([(- 2 * counter + 1) * vel_norm * math.cos(self.angle), - vel_norm * math.sin(self.angle)])
-        self.position_prev = init_position + np.array([0, - 5])
-        self.position_cur = self.position_prev + time_step * self.v_init
-
-    def position_update(self, g, ground): 
-            time_step = 0.2
-
-            self.position = 2 * self.position_cur - self.position_prev + [0, g * (time_step ** 2)]
-
-            self.position_prev = self.position_cur
-            self.position_cur = self.position
-   
-            if 0 <= self.position[0] <= 929:
-                if self.position[1] > np.where(ground[:, int(self.position[0])] == 0)[0][-1]:
-                    self.position[1] = np.where(ground[:, int(self.position[0])] == 0)[0][-1]
-            self.position = np.array([int(self.position[0]), int(self.position[1])])
-        
-      
+    def launch(self, angle, init_position, counter, vel_norm, facing): 
+        if self.count == len(self.alive): 
+            # double the capacity of the pool if it is full
+            for name in missile_pool.arrays: 
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+        self.table = trajectory_table(self.g, vel_norm, self.height, ANGLES)
+
+        k = self.count
+        self.origin[k] = init_position + np.array([0, - 5])
+        self.angle_index[k] = ANGLES.index(angle)
+        self.direction[k] = facing
+        self.age[k] = 1
+        self.position_prev[k] = self.origin[k]
+        self.position_cur[k] = self.origin[k] + self.table[self.angle_index[k], 1] * [facing, 1]
+        self.position[k] = self.position_cur[k]
+        self.owner[k] = counter
+        self.alive[k] = True
+        self.count += 1
+
+    def position_update(self, ground): 
+        n = self.count
+        cur = self.position_cur[:n]
+        self.position_prev[:n] = cur
+
+        if n > SCALAR_MISSILES: 
+            # next step of the flight paths (missiles at the end of the table have fallen beneath the battlefield)
+            age = self.age[:n]
+            np.minimum(age + 1, self.table.shape[1] - 1, out=age)
+            offsets = self.table[self.angle_index[:n], age]
+            cur[:, 0] = self.origin[:n, 0] + self.direction[:n] * offsets[:, 0]
+            cur[:, 1] = self.origin[:n, 1] + offsets[:, 1]
+
+            # missiles can not pass through the ground: they stop above the first ground pixel beneath their last row
+            # (the surface, or the floor of a cave they fly through)
+            inside = ((0 <= cur[:, 0]) & (cur[:, 0] <= ground.width - 1)).nonzero()[0]
+            lowest = ground.floors(self.position_prev[inside, 1].astype(int), cur[inside, 0].astype(int)) - 1
+            cur[inside, 1] = np.minimum(cur[inside, 1], lowest)
+        else: 
+            # the same steps missile by missile
+            last = self.table.shape[1] - 1
+            rows_prev = self.position_prev[:n, 1].tolist()
+            missiles = zip(self.origin[:n].tolist(), self.angle_index[:n].tolist(), self.direction[:n].tolist(), self.age[:n].tolist())
+            for k, ((x0, y0), angle_index, direction, age) in enumerate(missiles): 
+                self.age[k] = age = min(age + 1, last)
+                dx, dy = self.table[angle_index, age].tolist()
+                x, y = x0 + direction * dx, y0 + dy
+                if 0 <= x <= ground.width - 1: 
+                    y = min(y, ground.floor(int(rows_prev[k]), int(x)) - 1)
+                cur[k] = x, y
+
+        self.position[:n] = cur
+
+    def compact(self): 
+        keep = self.alive[:self.count].nonzero()[0]
+        for name in missile_pool.arrays: 
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self.count = len(keep)
+
+    def clear(self): 
+        self.alive[:self.count] = False
+        self.count = 0
+
+    def snapshot(self): 
+        return({name: getattr(self, name)[:self.count].copy() for name in missile_pool.arrays})
+
+    def restore(self, snapshot, table): 
+        # table: trajectory table of the missiles of the snapshot
+        count = len(snapshot["alive"])
+        for name in missile_pool.arrays: 
+            array = getattr(self, name)
+            if count > len(array): 
+                array = np.zeros((max(count, 2 * len(array)),) + array.shape[1:], dtype=array.dtype)
+                setattr(self, name, array)
+            array[:count] = snapshot[name]
+            array[count:] = 0
+        self.count = count
+        self.table = table
+
+def flight_distances(p0, facing, table, rows, ground, target, steps): 
+    """
+    Evaluates the flight paths of missiles fired at some of the cannon angles in one NumPy batch and returns how 
+    close each of them gets to a target before it hits the ground or leaves the screen.
+
+    Parameters:
+    - p0 (numpy.ndarray): Initial position of the missiles.
+    - facing (int): Direction the cannon points to (1 for right, -1 for left).
+    - table (numpy.ndarray): Trajectory table of the planet for all angles of ANGLES.
+    - rows (numpy.ndarray): Indices of the evaluated angles in ANGLES.
+    - ground (terrain): Terrain object representing the ground.
+    - target (numpy.ndarray): Position of the target.
+    - steps (int): Maximal number of steps of every flight path (rounded up to whole blocks of 64 steps).
+
+    Returns:
+    - numpy.ndarray: Smallest distance between the missile and the target for every angle of rows.
+    """
+    block = 64
+    closest = np.full(len(rows), np.inf)
+    flying = np.ones(len(rows), dtype=bool)
+    for k0 in range(2, min(table.shape[1], 2 + steps), block): 
+        x = p0[0] + facing * table[rows, k0:k0 + block, 0]
+        y = p0[1] + table[rows, k0:k0 + block, 1]
+
+        # missiles can not go beneath the surface of the ground (see missile_pool.position_update, the estimate 
+        # ignores caves)
+        m = x.astype(int)
+        y = np.minimum(y, ground.surfaces(np.clip(m, 0, ground.width - 1)) - 1)
+        n = y.astype(int)
+        # missiles explode when they leave the screen or when there is ground within 2 pixels (see update_ground)
+        out = ~((0 <= m) & (m < ground.width - 2) & (n < ground.height - 2))
+        landed = out | ((n > 2) & ground.touches(n.ravel(), np.clip(m, 0, ground.width - 1).ravel(), 2).reshape(n.shape))
+
+        # only the part of the flight path before the explosion counts
+        first = np.where(landed.any(axis=1), landed.argmax(axis=1), x.shape[1])
+        before = (np.arange(x.shape[1])[None, :] <= first[:, None]) & flying[:, None]
+        distance = np.where(before, np.hypot(x - target[0], y - target[1]), np.inf)
+        closest = np.minimum(closest, distance.min(axis=1))
+
+        flying &= ~landed.any(axis=1)
+        if not flying.any(): 
+            break
+    return(closest)
+
+def aim_solver(launch_position, facing, g, vel_norm, ground, target, budget=AIM_BUDGET): 
+    """
+    Finds the cannon angles whose missiles get closest to a target. Every AIM_COARSE-th angle is evaluated first, 
+    then the angles around the best of them.
+
+    Parameters:
+    - launch_position (numpy.ndarray): Position where the missiles are fired.
+    - facing (int): Direction the cannon points to (1 for right, -1 for left).
+    - g (float): Gravity of the planet.
+    - vel_norm (float): Norm of the initial velocity of the missiles.
+    - ground (terrain): Terrain object representing the ground.
+    - target (numpy.ndarray): Position of the target.
+    - budget (int, optional): Maximal number of missile positions evaluated (angles times steps of the flight 
+      paths), half of it for each pass. Counting positions instead of measuring time gives the same aim on 
+      every machine, so matches with aiming AI enemies stay reproducible.
+
+    Returns:
+    - numpy.ndarray: Smallest distance between the missile and the target for every angle of ANGLES (infinite for 
+      the angles that were not evaluated).
+    """
+    # flight paths of the missiles (see missile_pool.launch)
+    table = trajectory_table(g, vel_norm, ground.height, ANGLES)
+    p0 = launch_position + np.array([0, - 5])
+
+    closest = np.full(len(ANGLES), np.inf)
+    coarse = np.arange(0, len(ANGLES), AIM_COARSE)
+    closest[coarse] = flight_distances(p0, facing, table, coarse, ground, target, budget // 2 // len(coarse))
+    best = int(np.argmin(closest))
+    fine = np.arange(max(best - AIM_COARSE + 1, 0), min(best + AIM_COARSE, len(ANGLES)))
+    fine = fine[fine % AIM_COARSE != 0]
+    closest[fine] = flight_distances(p0, facing, table, fine, ground, target, budget // 2 // len(fine))
+    return(closest)
 
 class AI_enemy: 
     """
@@ -147,6 +332,11 @@ class AI_enemy:
     - time_decision_shooting (float): Timestamp of the last shooting decision.
     - time_decision_moving (float): Timestamp of the last moving decision.
     - tank_computer (tank): Instance of the AI tank.
+    - clock (tick_clock): Clock of the simulation.
+    - rng (random.Random): Random number generator for the decisions.
+    - aiming (bool): If True the AI tank aims at the closest enemy tank instead of shooting at random.
+    - aim_budget (int): Largest number of missile positions the aim solver evaluates per decision.
+    - aim_frame (int): Frame of the cannon chosen by the aim solver (None if there is no aim).
 
     Methods:
     - __init__: Initializes an AI_enemy object.
@@ -155,29 +345,35 @@ class AI_enemy:
     - decision_shooting: Makes a decision for AI tank shooting.
     - decision_reloading: Makes a decision for AI tank reloading.
     - decision_angle_adjusting: Makes a decision for AI tank adjusting cannon angle.
+    - decision_aiming: Makes a decision for AI tank aiming and shooting.
     """
-    def __init__(self, tank_computer): 
+    def __init__(self, tank_computer, clock, rng, aiming=False, aim_budget=AIM_BUDGET): 
         self.distance = 110
-        self.time_decision_shooting = time.time()
-        self.time_decision_moving = time.time()
+        self.clock = clock
+        self.rng = rng
+        self.time_decision_shooting = clock.time()
+        self.time_decision_moving = clock.time()
         self.tank_computer = tank_computer
+        self.aiming = aiming
+        self.aim_budget = aim_budget
+        self.aim_frame = None
 
     def decision_running(self, tank_computer): 
         if self.distance < 110: 
             self.distance = 110
-            random_direction = random.choice([-1, 1])
+            random_direction = self.rng.choice([-1, 1])
             tank_computer.move_direction = random_direction
 
     def decision_movement(self, tank_computer): 
-        if time.time() - self.time_decision_moving > 5 + random.random():
-            random_direction = random.choice([-1, 0, 1])
+        if self.clock.time() - self.time_decision_moving > 5 + self.rng.random():
+            random_direction = self.rng.choice([-1, 0, 1])
             tank_computer.move_direction = random_direction
-            self.time_decision_moving = time.time()
+            self.time_decision_moving = self.clock.time()
 
     def decision_shooting(self, tank_computer, vel_norm): 
-        if time.time() - self.time_decision_shooting > 0.2 + random.random(): 
-            self.time_decision_shooting = time.time()
-            if random.choice([-1, 1]) == 1: 
+        if self.clock.time() - self.time_decision_shooting > 0.2 + self.rng.random(): 
+            self.time_decision_shooting = self.clock.time()
+            if self.rng.choice([-1, 1]) == 1: 
                 tank_computer.shoot(vel_norm)
                 self.decision_angle_adjusting(tank_computer)
                 
@@ -187,15 +383,34 @@ class AI_enemy:
 
     def decision_angle_adjusting(self, tank_computer): 
         
-            rnd = random.choice([-1, 0, 1])
+            # the cannon is turned by 25 degrees at once
+            rnd = self.rng.choice([-1, 0, 1])
             if rnd == 1 or tank_computer.frame == 1: 
-                tank_computer.angle_adjust("pos")
-            elif rnd == -1 or tank_computer.frame == 6:
-                tank_computer.angle_adjust("neg")
+                tank_computer.angle_adjust("pos", 25)
+            elif rnd == -1 or tank_computer.frame == len(ANGLES):
+                tank_computer.angle_adjust("neg", 25)
 
+    def decision_aiming(self, tank_computer, targets, g, vel_norm, ground): 
+        if not targets: 
+            # nobody to aim at (e.g. all tanks of other teams are destroyed), the tank shoots at random
+            self.aim_frame = None
+            self.decision_shooting(tank_computer, vel_norm)
+            return
+        if self.clock.time() - self.time_decision_shooting > 0.2 + self.rng.random(): 
+            self.time_decision_shooting = self.clock.time()
+            # aim at the closest enemy tank
+            target = min(targets, key=lambda panzer: abs(panzer.position[0] - tank_computer.position[0]))
+            distances = aim_solver(tank_computer.position + np.array([0, - 10]), tank_computer.facing, g, vel_norm, 
+                                   ground, target.position + np.array([0, - 8]), self.aim_budget)
+            self.aim_frame = int(np.argmin(distances)) + 1
 
-            
-            
-
-        
-        
+        # turn the cannon (at most 10 degrees per frame, so the aim is not outdated when the missile is fired) 
+        # and shoot once it points to the chosen angle
+        if self.aim_frame is not None: 
+            if tank_computer.frame < self.aim_frame: 
+                tank_computer.angle_adjust("pos", min(10, self.aim_frame - tank_computer.frame))
+            elif tank_computer.frame > self.aim_frame: 
+                tank_computer.angle_adjust("neg", min(10, tank_computer.frame - self.aim_frame))
+            else: 
+                tank_computer.shoot(vel_norm)
+                self.aim_frame = None
@@ -0,0 +1,424 @@
+import zlib
+import numpy as np
+from functools import lru_cache
+
+# number of columns of a chunk of the terrain
+CHUNK_WIDTH = 256
+# columns of up to this many neighboring chunks are looked up at once
+NEIGHBOR_CHUNKS = 8
+# type of the values of every attribute of a ground_chunk
+CHUNK_TYPES = {"bits": np.uint8, "top": np.int16, "solid": bool}
+# settling of loose ground: at most this many columns are moved per frame, by this many rows
+SETTLE_COLUMNS = 64
+SETTLE_ROWS = 3
+# touches checks up to this many windows one by one (for a few windows the NumPy calls cost more than the checks)
+SCALAR_WINDOWS = 8
+
+@lru_cache(maxsize=None)
+def disc_stencil(radius):
+    """
+    Returns a boolean mask of the pixels within a given radius around the center of a (2 * radius + 1) x (2 * radius + 1) grid.
+
+    Parameters:
+    - radius (int): Radius of the disc.
+
+    Returns:
+    - numpy.ndarray: Read-only boolean array that is True inside the disc.
+    """
+    offsets = np.arange(-radius, radius + 1)
+    stencil = offsets[:, None]**2 + offsets[None, :]**2 <= radius**2
+    stencil.flags.writeable = False
+    return(stencil)
+
+@lru_cache(maxsize=None)
+def disc_depth(radius):
+    """
+    Returns for every column of the disc stencil the offset of its lowest pixel from the center row.
+
+    Parameters:
+    - radius (int): Radius of the disc.
+
+    Returns:
+    - numpy.ndarray: Read-only int16 array of length 2 * radius + 1.
+    """
+    stencil = disc_stencil(radius)
+    depth = (radius - np.argmax(stencil[::-1], axis=0)).astype(np.int16)
+    depth.flags.writeable = False
+    return(depth)
+
+class ground_chunk:
+    """
+    Represents the ground of a chunk of columns as a bit-packed mask (one bit per pixel).
+
+    Attributes:
+    - height (int): Number of rows of a column.
+    - bits (numpy.ndarray): uint8 array with one row of ceil(height / 8) bytes per column, bit 7 - n % 8 of byte n // 8
+      is set if row n of the column is ground.
+    - top (numpy.ndarray): int16 array containing for every column the row of the topmost ground pixel
+      (equal to height if there is no ground in the column).
+    - solid (numpy.ndarray): True for the columns that are ground from the topmost ground pixel down to the bottom
+      (columns without caves).
+
+    Methods:
+    - __init__: Initializes a ground_chunk object.
+    - update: Computes top and solid of columns from the mask.
+    """
+
+    def __init__(self, bits, height, top=None):
+        self.height = height
+        self.bits = bits
+        if top is None:
+            self.top = np.empty(len(bits), dtype=np.int16)
+            self.solid = np.empty(len(bits), dtype=bool)
+            self.update(0, len(bits))
+        else:
+            # the columns of a generated chunk have no caves
+            self.top = np.array(top, dtype=np.int16)
+            self.solid = np.ones(len(bits), dtype=bool)
+
+    def update(self, c0, c1):
+        mask = np.unpackbits(self.bits[c0:c1], axis=1, count=self.height).view(bool)
+        top = np.where(mask.any(axis=1), mask.argmax(axis=1), self.height)
+        self.top[c0:c1] = top
+        # a column has no caves if all pixels beneath its topmost ground pixel are ground
+        self.solid[c0:c1] = np.count_nonzero(mask, axis=1) == self.height - top
+
+class terrain:
+    """
+    Represents the (destructible) ground of the game as a two-dimensional mask with one bit per pixel, so craters
+    beneath the surface leave caves and overhangs.
+
+    The columns are stored in chunks of chunk_width columns. A chunk is only generated when one of its columns
+    is needed (e.g. when the camera or a missile reaches it), so a world can be much wider than the window.
+    Chunks that were never changed by a crater can be released and are generated again when they are needed.
+    Every chunk keeps the topmost ground pixel of its columns, so columns without caves are checked without
+    looking at the mask.
+
+    Attributes:
+    - width (int): Number of columns (pixels along the x-axis) of the ground.
+    - height (int): Number of rows (pixels along the y-axis) of the ground.
+    - generate (function): Returns the top rows of the columns [c0, c1) as generated (without craters).
+    - chunk_width (int): Number of columns of a chunk.
+    - chunks (dict): The generated chunks (ground_chunk objects) keyed by their number.
+    - modified (set): Numbers of the chunks changed by craters (they are never released).
+    - caves (set): Numbers of the chunks that contain columns with caves.
+    - dirty (list): Column ranges [start, stop) changed since they were last drawn.
+    - settling (bool): If True ground without ground beneath it falls down (see settle).
+    - unsettled (list): Columns with loose ground in the order they are settled.
+
+    Methods:
+    - __init__: Initializes a terrain object.
+    - build: Generates a chunk.
+    - chunk: Returns a chunk (generated if needed).
+    - gather: Returns an attribute of the chunks for several columns.
+    - columns: Returns the top rows of a range of columns.
+    - mask: Returns the mask of a range of columns.
+    - surface: Returns the row of the topmost ground pixel of a column.
+    - surfaces: Returns the rows of the topmost ground pixels of several columns.
+    - is_ground: Checks if a pixel belongs to the ground.
+    - grounds: Checks for several pixels if they belong to the ground.
+    - floor: Returns the first ground pixel of a column at or beneath a row.
+    - floors: Returns the first ground pixels of several columns at or beneath rows.
+    - touches: Checks for several pixels if there is ground in a square window around them.
+    - carve: Removes the ground inside a crater.
+    - settle: Lets loose ground fall down.
+    - release: Forgets chunks that are not needed and can be generated again.
+    - snapshot: Returns the changed chunks.
+    - restore: Sets the ground to the state of a snapshot.
+    """
+
+    def __init__(self, generate, width, height, chunk_width=CHUNK_WIDTH):
+        self.generate = generate
+        self.width = width
+        self.height = height
+        self.chunk_width = chunk_width
+        self.chunks = {}
+        self.modified = set()
+        self.caves = set()
+        self.dirty = []
+        self.settling = False
+        self.unsettled = []
+
+    def build(self, k):
+        # generated columns are ground from their top row down to the bottom: the bytes beneath the byte of the
+        # top row are full, the byte of the top row is filled from the top row on
+        c0 = k * self.chunk_width
+        top = np.asarray(self.generate(c0, min(c0 + self.chunk_width, self.width)), dtype=np.int16)
+        first = top // 8
+        bytes_per_column = (self.height + 7) // 8
+        bits = np.where(np.arange(bytes_per_column)[None, :] > first[:, None], 0xFF, 0).astype(np.uint8)
+        partial = np.flatnonzero(first < bytes_per_column)
+        bits[partial, first[partial]] = 0xFF >> (top[partial] % 8)
+        return(ground_chunk(bits, self.height, top))
+
+    def chunk(self, k):
+        chunk = self.chunks.get(k)
+        if chunk is None:
+            chunk = self.chunks[k] = self.build(k)
+        return(chunk)
+
+    def gather(self, cols, name, index=None):
+        """
+        Returns an attribute of the chunks (bits, top or solid) for several columns.
+
+        Parameters:
+        - cols (numpy.ndarray): Columns (any shape).
+        - name (str): Name of the attribute of ground_chunk.
+        - index (numpy.ndarray, optional): Byte of every column (bits only).
+
+        Returns:
+        - numpy.ndarray: Values of the attribute, same shape as cols (bits without index add the bytes as a last axis).
+        """
+        cols = np.asarray(cols)
+        if cols.size == 0:
+            return np.zeros(cols.shape, dtype=CHUNK_TYPES[name])
+        first, last = int(cols.min()) // self.chunk_width, int(cols.max()) // self.chunk_width
+        if last - first < NEIGHBOR_CHUNKS:
+            # a few neighboring chunks (e.g. the flight path of a missile) are joined
+            if first == last:
+                values = getattr(self.chunk(first), name)
+            else:
+                values = np.concatenate([getattr(self.chunk(k), name) for k in range(first, last + 1)])
+            local = cols - first * self.chunk_width if first else cols
+            return values[local] if index is None else values[local, index]
+        # columns far apart are looked up chunk by chunk, so the chunks between them are not generated
+        chunk_ids = cols // self.chunk_width
+        result = None
+        for k in np.unique(chunk_ids).tolist():
+            inside = chunk_ids == k
+            values = getattr(self.chunk(k), name)
+            local = cols[inside] - k * self.chunk_width
+            part = values[local] if index is None else values[local, index[inside]]
+            if result is None:
+                # whole columns of bits add the bytes as a last axis
+                result = np.empty(cols.shape + part.shape[1:], dtype=CHUNK_TYPES[name])
+            result[inside] = part
+        return result
+
+    def columns(self, c0, c1):
+        return(self.gather(np.arange(c0, c1), "top"))
+
+    def mask(self, c0, c1):
+        # uint8 array of shape (c1 - c0, height), 1 for ground
+        first, last = c0 // self.chunk_width, (c1 - 1) // self.chunk_width
+        bits = np.concatenate([self.chunk(k).bits for k in range(first, last + 1)])[c0 - first * self.chunk_width:c1 - first * self.chunk_width]
+        return(np.unpackbits(bits, axis=1, count=self.height))
+
+    def surface(self, m):
+        # row of the topmost ground pixel in column m (the pixel above it is the lowest free pixel)
+        m = int(m)
+        chunk = self.chunks.get(m // self.chunk_width)
+        if chunk is None:
+            chunk = self.chunk(m // self.chunk_width)
+        return int(chunk.top[m % self.chunk_width])
+
+    def surfaces(self, cols):
+        return self.gather(cols, "top")
+
+    def is_ground(self, n, m):
+        # everything beneath the bottom is ground, everything above the window is air
+        n, m = int(n), int(m)
+        if n < 0:
+            return False
+        if n >= self.height:
+            return True
+        chunk = self.chunk(m // self.chunk_width)
+        c = m % self.chunk_width
+        if chunk.solid[c]:
+            return bool(chunk.top[c] <= n)
+        return bool(chunk.bits[c, n >> 3] >> (7 - (n & 7)) & 1)
+
+    def grounds(self, rows, cols):
+        rows = np.asarray(rows, dtype=np.int64)
+        # (np.clip is slow for the few pixels of a frame)
+        clipped = np.minimum(np.maximum(rows, 0), self.height - 1)
+        bits = self.gather(cols, "bits", clipped >> 3) >> (7 - (clipped & 7)) & 1
+        return (rows >= self.height) | ((rows >= 0) & (bits == 1))
+
+    def floor(self, n, m):
+        """
+        Returns the first ground pixel of a column at or beneath a row, e.g. the ground a tank lands on.
+
+        Parameters:
+        - n (int): The row.
+        - m (int): The column.
+
+        Returns:
+        - int: Row of the ground pixel (height if there is no ground beneath the row).
+        """
+        n, m = int(n), int(m)
+        chunk = self.chunk(m // self.chunk_width)
+        c = m % self.chunk_width
+        top = int(chunk.top[c])
+        if n <= top:
+            return(top)
+        if n >= self.height or chunk.solid[c]:
+            return(n)
+        beneath = np.unpackbits(chunk.bits[c], count=self.height)[n:]
+        first = int(beneath.argmax())
+        return(n + first if beneath[first] else self.height)
+
+    def floors(self, rows, cols):
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols)
+        top = self.surfaces(cols)
+        # exact for the columns without caves
+        floor = np.maximum(rows, top)
+        if self.caves:
+            for j in ((rows > top) & ~self.gather(cols, "solid")).nonzero()[0]:
+                floor[j] = self.floor(rows[j], cols[j])
+        return floor
+
+    def touch(self, n, m, reach):
+        # True if there is ground within reach of a pixel (the window n - reach ... n + reach, clipped like in touches)
+        n, m = int(n), int(m)
+        c0, c1 = min(max(m - reach, 0), self.width - 1), min(max(m + reach, 0), self.width - 1)
+        for c in range(c0, c1 + 1):
+            chunk = self.chunk(c // self.chunk_width)
+            i = c % self.chunk_width
+            if chunk.top[i] > n + reach:
+                continue
+            if not self.caves or chunk.solid[i]:
+                return True
+            if any(self.is_ground(row, c) for row in range(n - reach, n + reach + 1)):
+                return True
+        return False
+
+    def touches(self, rows, cols, reach):
+        if len(rows) <= SCALAR_WINDOWS:
+            return np.array([self.touch(n, m, reach) for n, m in zip(np.asarray(rows).tolist(), np.asarray(cols).tolist())], dtype=bool)
+        # columns of the windows rows - reach ... rows + reach (clipped to the ground)
+        offsets = np.arange(-reach, reach + 1)
+        window = np.minimum(np.maximum(np.asarray(cols)[:, None] + offsets, 0), self.width - 1)
+        rows = np.asarray(rows)[:, None]
+        # a window contains ground if the surface of one of its columns lies above its lowest row
+        near = self.surfaces(window) <= rows + reach
+        if self.caves and near.any():
+            # in columns with caves there may be air beneath the surface, so the pixels of the window are checked
+            # (all rows of all these columns at once)
+            j, i = np.nonzero(near & ~self.gather(window, "solid"))
+            if len(j):
+                pixels = rows[j].astype(np.int64) + offsets
+                near[j, i] = self.grounds(pixels, np.broadcast_to(window[j, i][:, None], pixels.shape)).any(axis=1)
+        return near.any(axis=1)
+
+    def carve(self, n, m, radius):
+        """
+        Removes the ground within a given radius around a pixel. Only the bytes of the mask covered by the crater
+        are updated, the ground above the crater stays where it is.
+
+        Parameters:
+        - n (int): Row of the center of the crater.
+        - m (int): Column of the center of the crater.
+        - radius (int): Radius of the crater.
+        """
+        # clip the crater to the columns of the ground and above the bottom row (it can not be removed)
+        c0 = max(m - radius, 0)
+        c1 = min(m + radius + 1, self.width)
+        r0 = max(n - radius, 0)
+        r1 = min(n + radius + 1, self.height - 1)
+        if c0 >= c1 or r0 >= r1:
+            return
+        # stencil indexed by [column, row]
+        stencil = disc_stencil(radius)[r0 - n + radius:r1 - n + radius, c0 - m + radius:c1 - m + radius].T
+        b0, b1 = r0 // 8, (r1 - 1) // 8 + 1
+        # a crater may cover two chunks
+        for k in range(c0 // self.chunk_width, (c1 - 1) // self.chunk_width + 1):
+            origin = k * self.chunk_width
+            start, stop = max(c0, origin), min(c1, origin + self.chunk_width)
+            chunk = self.chunk(k)
+            bits = chunk.bits[start - origin:stop - origin, b0:b1]
+            mask = np.unpackbits(bits, axis=1)
+            mask[:, r0 - 8 * b0:r1 - 8 * b0][stencil[start - c0:stop - c0]] = 0
+            bits[:] = np.packbits(mask, axis=1)
+            chunk.update(start - origin, stop - origin)
+            self.modified.add(k)
+            if chunk.solid.all():
+                self.caves.discard(k)
+            else:
+                self.caves.add(k)
+            if self.settling:
+                # columns with air beneath ground are loose (only columns of the crater can become loose)
+                queued = set(self.unsettled)
+                loose = start + np.flatnonzero(~chunk.solid[start - origin:stop - origin])
+                self.unsettled.extend(c for c in loose.tolist() if c not in queued)
+        self.dirty.append((c0, c1))
+
+    def settle(self, budget=SETTLE_COLUMNS, rows=SETTLE_ROWS):
+        """
+        Lets loose ground fall down: every ground pixel with air somewhere beneath it falls by one row per step, so
+        overhangs fall as a whole and pile up on the ground beneath them. Only the columns in unsettled are moved,
+        at most budget columns per call, so the cost of a frame is bounded. Columns that are still loose are queued
+        again at the end.
+
+        Parameters:
+        - budget (int, optional): Largest number of columns moved.
+        - rows (int, optional): Number of rows the ground falls.
+        """
+        if not self.unsettled:
+            return
+        cols = np.array(self.unsettled[:budget])
+        del self.unsettled[:budget]
+        # the unused bits of the last byte are kept as they are
+        full = np.unpackbits(self.gather(cols, "bits"), axis=1).view(bool)
+        mask = full[:, :self.height]
+        for _ in range(rows):
+            # air in one of the rows beneath every row (the bottom row never falls)
+            air = np.logical_or.accumulate(~mask[:, :0:-1], axis=1)[:, ::-1]
+            fall = mask[:, :-1] & air
+            mask[:, :-1] &= ~fall
+            mask[:, 1:] |= fall
+        bits = np.packbits(full, axis=1)
+        chunk_ids = cols // self.chunk_width
+        for k in np.unique(chunk_ids).tolist():
+            inside = chunk_ids == k
+            local = cols[inside] - k * self.chunk_width
+            chunk = self.chunk(k)
+            chunk.bits[local] = bits[inside]
+            chunk.update(int(local.min()), int(local.max()) + 1)
+            if chunk.solid.all():
+                self.caves.discard(k)
+            else:
+                self.caves.add(k)
+            self.dirty.append((int(cols[inside].min()), int(cols[inside].max()) + 1))
+        self.unsettled.extend(cols[~self.gather(cols, "solid")].tolist())
+
+    def release(self, keep):
+        """
+        Forgets the chunks that were not changed by craters, except the given ones.
+
+        Parameters:
+        - keep (set): Numbers of the chunks that are kept (e.g. the visible ones).
+        """
+        for k in [k for k in self.chunks if k not in keep and k not in self.modified]:
+            del self.chunks[k]
+
+    def snapshot(self):
+        # the other chunks are the same as when they were generated, the masks are mostly runs of full and empty 
+        # bytes and shrink from 23 kB to 1 or 2 kB per chunk
+        return({k: zlib.compress(self.chunks[k].bits.tobytes(), 1) for k in self.modified})
+
+    def restore(self, snapshot):
+        """
+        Sets the ground to the state of a snapshot. Only the columns that differ are marked as dirty.
+
+        Parameters:
+        - snapshot (dict): Compressed masks of the changed chunks as returned by snapshot.
+        """
+        for k in self.modified | set(snapshot):
+            chunk = self.chunk(k)
+            if k in snapshot: 
+                saved = np.frombuffer(zlib.decompress(snapshot[k]), dtype=np.uint8).reshape(chunk.bits.shape)
+            else: 
+                saved = self.build(k).bits
+            changed = np.flatnonzero((chunk.bits != saved).any(axis=1))
+            if len(changed):
+                chunk.bits[:] = saved
+                chunk.update(0, len(chunk.bits))
+                c0 = k * self.chunk_width
+                self.dirty.append((c0 + int(changed[0]), c0 + int(changed[-1]) + 1))
+            if chunk.solid.all():
+                self.caves.discard(k)
+            else:
+                self.caves.add(k)
+        self.modified = set(snapshot)
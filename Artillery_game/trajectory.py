@@ -0,0 +1,64 @@
+import math
+import numpy as np
+from cache import cache_path, read_cache, write_cache
+
+# trajectory tables kept in memory, keyed by the parameters of the flight
+tables = {}
+
+def build_table(g, vel_norm, height, angles):
+    """
+    Computes the flight paths of missiles fired at the given angles (ignoring the ground).
+
+    The missiles are integrated with the Verlet scheme of the game (time step 0.2). With constant gravity the
+    scheme has the closed form p_k = p_0 + k * dt * v + g * dt^2 * k * (k - 1) / 2, so every step is computed directly.
+
+    Parameters:
+    - g (float): Gravity of the planet.
+    - vel_norm (float): Norm of the initial velocity of the missiles.
+    - height (int): Height of the battlefield, the paths end when every missile has fallen deeper than height.
+    - angles (list): Angles of the cannon in degrees.
+
+    Returns:
+    - numpy.ndarray: Array of shape (len(angles), steps, 2) with the offsets of the missiles from their initial
+      position (for missiles fired to the right, the x-offsets change their sign for missiles fired to the left).
+    """
+    time_step = 0.2
+    radians = np.radians(angles)[:, None]
+    vx = vel_norm * np.cos(radians)
+    vy = - vel_norm * np.sin(radians)
+
+    # number of steps until the missile fired most upwards has fallen deeper than height
+    # (positive root of a * k^2 + b * k - height)
+    a = g * time_step**2 / 2
+    b = float(vy.min()) * time_step - a
+    steps = math.ceil((- b + math.sqrt(b**2 + 4 * a * height)) / (2 * a)) + 2
+
+    k = np.arange(steps)
+    table = np.empty((len(angles), steps, 2))
+    table[:, :, 0] = k * time_step * vx
+    table[:, :, 1] = k * time_step * vy + g * time_step**2 * k * (k - 1) / 2
+    return(table)
+
+def trajectory_table(g, vel_norm, height, angles):
+    """
+    Returns the trajectory table of a planet. Tables are built once, kept in memory and saved in CACHE_DIR.
+
+    Parameters:
+    - g (float): Gravity of the planet.
+    - vel_norm (float): Norm of the initial velocity of the missiles.
+    - height (int): Height of the battlefield.
+    - angles (list): Angles of the cannon in degrees.
+
+    Returns:
+    - numpy.ndarray: Read-only table as returned by build_table.
+    """
+    key = (float(g), float(vel_norm), int(height), tuple(angles))
+    if key not in tables:
+        path = cache_path("trajectory_", key, ".npy")
+        table = read_cache(path, np.load)
+        if table is None:
+            table = build_table(g, vel_norm, height, angles)
+            write_cache(path, lambda file: np.save(file, table))
+        table.flags.writeable = False
+        tables[key] = table
+    return(tables[key])